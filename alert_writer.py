@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import deque
+
+# Severity order used to decide which alert gives way when the queue is full
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'critical': 3}
+
+
+class alert_writer:
+    """
+    Writes alerts on a background thread so the frame loop never waits on the database.
+    Alerts wait in a bounded queue and are committed in batches. When the queue is full
+    the oldest, least severe queued alert is dropped to make room, or the new alert
+    itself when nothing queued is less severe than it.
+
+    Args:
+    write: called on the writer thread with a list of queued alerts; stores them in one transaction.
+    max_queue: most alerts held in memory (each carries a frame for its snapshot).
+    batch_size: most alerts committed together.
+    flush_interval: seconds to let a batch fill up before writing it.
+    on_drop: called with the alerts that were dropped or failed to write, outside the queue lock.
+    """
+
+    def __init__(self, write, max_queue=100, batch_size=50, flush_interval=0.5, on_drop=None):
+        self.write = write
+        self.on_drop = on_drop
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, alert):
+        """Queue an alert without blocking; returns False when it is dropped"""
+        if not self.running:
+            self.start()
+        rank = SEVERITY_RANK.get(alert.get('severity'), 1)
+        dropped = None
+        with self.condition:
+            if len(self.queue) >= self.max_queue:
+                victim = min(range(len(self.queue)),
+                             key=lambda i: (SEVERITY_RANK.get(self.queue[i].get('severity'), 1), i))
+                self.dropped += 1
+                if SEVERITY_RANK.get(self.queue[victim].get('severity'), 1) >= rank:
+                    dropped = alert
+                else:
+                    dropped = self.queue[victim]
+                    del self.queue[victim]
+            if dropped is not alert:
+                self.queue.append(alert)
+                self.condition.notify()
+        if dropped is not None:
+            self.dropped_alerts([dropped])
+        return dropped is not alert
+
+    def dropped_alerts(self, alerts):
+        if self.on_drop is None:
+            return
+        try:
+            self.on_drop(alerts)
+        except Exception as e:
+            print(f"Error handling {len(alerts)} dropped alert(s): {e}")
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.running and not self.queue:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                # Let a burst of alerts share one commit
+                deadline = time.time() + self.flush_interval
+                while self.running and len(self.queue) < self.batch_size and time.time() < deadline:
+                    self.condition.wait(deadline - time.time())
+                batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+
+            try:
+                self.write(batch)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(batch)
+                print(f"Error writing {len(batch)} alert(s) to database: {e}")
+                self.dropped_alerts(batch)
+
+    def close(self, timeout=5.0):
+        """Stop after writing whatever is still queued"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        with self.condition:
+            depth = len(self.queue)
+        return {
+            'queue_depth': depth,
+            'max_queue': self.max_queue,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches
+        }
@@ -1,12 +1,20 @@
 # app.py
 
+import atexit
+from collections import Counter
 import os
+import sqlite3
+import time
 import cv2
-import base64
+import numpy as np
+import io
 import json
-from flask import Flask, render_template, Response, request, redirect, flash, session, jsonify
+from flask import Flask, render_template, Response, request, redirect, flash, session, jsonify, send_file, abort, url_for
 from datetime import datetime, timedelta
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
 from werkzeug.utils import secure_filename
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 
@@ -21,7 +29,21 @@ from models.activity_monitoring import activity_monitoring
 from models.defect_detection import defect_detection
 from models.crowd_detection import crowd_detection
 from models.air_quality_detection import air_quality_detection
-from models.pose import detect_l_pose
+from models.model_registry import memory_report
+from models.frame_context import frame_context
+from models.inference_scheduler import inference_scheduler
+from detector_scheduler import detector_scheduler, parse_cadences, load_cadences
+from alert_writer import alert_writer
+from cooldown_cache import cooldown_cache
+from snapshot_store import snapshot_store
+from stats_cache import stats_cache
+from migrate_database import apply_pragmas, ROLLUP_BUCKETS, rollups_current, rebuild_rollups
+from camera_regions import parse_zones, parse_roi, scale_zones, roi_bounds
+from models.motion_gate import motion_gate
+from models.person_tracker import person_tracker
+from camera_pipeline import (get_pipeline, update_pipeline, remove_pipeline, find_pipeline,
+                             published_frames, frame_file_is_fresh, read_published_stats,
+                             parse_resolution, resize_to)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'the random string'
@@ -30,10 +52,55 @@ app.config["SQLALCHEMY_BINDS"] = {
     "cams": "sqlite:///cams.db",
     "alerts": "sqlite:///alerts.db"
 }
+# Cross-camera inference batching: how long a frame may wait for others, and the batch cap
+app.config['INFERENCE_MAX_WAIT'] = 0.02
+app.config['INFERENCE_MAX_BATCH'] = 16
+# Adaptive analysis rate: capture-to-output latency target, share of a core per camera, rate ceiling
+app.config['ANALYSIS_TARGET_LATENCY'] = 0.5
+app.config['ANALYSIS_CPU_BUDGET'] = 0.5
+app.config['ANALYSIS_MAX_FPS'] = 15.0
+# Background alert writer: alerts held in memory, alerts per transaction, seconds a batch may wait to fill
+app.config['ALERT_QUEUE_SIZE'] = 100
+app.config['ALERT_BATCH_SIZE'] = 50
+app.config['ALERT_FLUSH_INTERVAL'] = 0.5
+# Seconds between two alerts of the same type from one camera (per track or zone where known)
+app.config['ALERT_COOLDOWNS'] = {
+    'default': 30,
+    'emergency_pose': 60
+}
+# Seconds dashboard counters are served from memory before being recounted
+app.config['DASHBOARD_STATS_TTL'] = 30
+# Run detection inside the web process when no detection service publishes frames for a camera.
+# Start the web process with DETECTION_SERVICE=1 when detection_service.py is deployed, so it only
+# streams published frames and never opens cameras or raises alerts of its own.
+app.config['IN_PROCESS_DETECTION'] = os.environ.get('DETECTION_SERVICE') != '1'
 
 db = SQLAlchemy(app)
+
+@event.listens_for(Engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL mode and cache pragmas on every SQLite connection"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        apply_pragmas(dbapi_connection)
 login_manager = LoginManager(app)
 
+# Annotated frames published by the headless detection service (detection_service.py)
+LIVE_FRAME_DIR = os.path.join(app.instance_path, 'live')
+
+# Alert snapshots and thumbnails, addressed by the SHA-256 of the JPEG
+SNAPSHOT_DIR = os.path.join(app.instance_path, 'snapshots')
+snapshots = snapshot_store(SNAPSHOT_DIR)
+# Snapshots never change once written, so browsers may keep them for a year
+SNAPSHOT_MAX_AGE = 365 * 24 * 3600
+
+# Alert listing page size (default and largest a client may ask for)
+ALERT_PAGE_SIZE = 50
+ALERT_PAGE_MAX = 200
+ALERT_FILTERS = ['camera', 'type', 'severity', 'since', 'until']
+
+# Example restricted zone for cameras without configured zones, as fractions of the frame width and height
+DEFAULT_RESTRICTED_ZONES = [((0.1, 0.17), (0.3, 0.17), (0.3, 0.52), (0.1, 0.52))]
+
 @login_manager.user_loader
 def load_user(user_id):
     return User.query.get(int(user_id))
@@ -61,6 +128,16 @@ class Camera(db.Model):
     crowd_detection = db.Column(db.Boolean, default=False)
     air_quality_monitoring = db.Column(db.Boolean, default=False)
     region = db.Column(db.Boolean, default=False)
+    min_analysis_fps = db.Column(db.Float, default=1.0)
+    detector_cadence = db.Column(db.Text)
+    # 'WIDTHxHEIGHT'; blank keeps the captured resolution
+    inference_resolution = db.Column(db.String(20))
+    display_resolution = db.Column(db.String(20))
+    snapshot_resolution = db.Column(db.String(20))
+    # Restricted zones as a JSON list of [x, y] polygons and the region of interest as 'x1,y1,x2,y2',
+    # both in fractions of the frame; region is True while an roi is configured
+    zones = db.Column(db.Text)
+    roi = db.Column(db.String(100))
 
 class Alert(db.Model):  
     id = db.Column(db.Integer, primary_key=True)
@@ -68,10 +145,42 @@ class Alert(db.Model):
     date_time = db.Column(db.DateTime)
     alert_type = db.Column(db.String(50))
     severity = db.Column(db.String(20), default='medium')
+    # Only alerts from before the snapshot store still carry their JPEG here
     frame_snapshot = db.Column(db.LargeBinary)
     description = db.Column(db.Text)
     camera_id = db.Column(db.String(100))
     confidence = db.Column(db.Float, default=0.0)
+    # Key of the snapshot in the snapshot store (snapshot_store.py) and its size
+    snapshot_key = db.Column(db.String(64))
+    snapshot_width = db.Column(db.Integer)
+    snapshot_height = db.Column(db.Integer)
+    snapshot_bytes = db.Column(db.Integer)
+
+    # Same indexes as migrate_database.ALERT_INDEXES
+    __table_args__ = (
+        db.Index('ix_alert_user_time', 'user_id', 'date_time'),
+        db.Index('ix_alert_user_severity_time', 'user_id', 'severity', 'date_time'),
+        db.Index('ix_alert_user_type_time', 'user_id', 'alert_type', 'date_time'),
+        db.Index('ix_alert_user_camera_type_time', 'user_id', 'camera_id', 'alert_type', 'date_time'),
+        db.Index('ix_alert_snapshot_key', 'snapshot_key'),
+    )
+
+class AlertRollup(db.Model):
+    """Alert counts per time bucket (see ROLLUP_BUCKETS), kept current by the alert writer"""
+    id = db.Column(db.Integer, primary_key=True)
+    granularity = db.Column(db.String(10), nullable=False)
+    # Start of the bucket as 'YYYY-MM-DD HH:MM:SS'
+    bucket = db.Column(db.String(19), nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    camera_id = db.Column(db.String(100), nullable=False, default='')
+    alert_type = db.Column(db.String(50), nullable=False)
+    severity = db.Column(db.String(20), nullable=False)
+    alert_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('granularity', 'user_id', 'bucket', 'camera_id', 'alert_type', 'severity',
+                            name='uq_alert_rollup'),
+    )
 
 class SystemMetrics(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -81,7 +190,34 @@ class SystemMetrics(db.Model):
     system_uptime = db.Column(db.Float, default=0.0)
     detection_accuracy = db.Column(db.Float, default=0.0)
 
-# Initialize detection models
+inference_batcher = inference_scheduler(
+    max_wait=app.config['INFERENCE_MAX_WAIT'],
+    max_batch=app.config['INFERENCE_MAX_BATCH']
+)
+
+alert_queue = alert_writer(
+    lambda batch: write_alerts(batch),  # defined with add_to_db below
+    max_queue=app.config['ALERT_QUEUE_SIZE'],
+    batch_size=app.config['ALERT_BATCH_SIZE'],
+    flush_interval=app.config['ALERT_FLUSH_INTERVAL'],
+    on_drop=lambda alerts: release_cooldowns(alerts)
+)
+# Write out alerts still queued when the process exits
+atexit.register(alert_queue.close)
+
+alert_cooldowns = cooldown_cache(
+    app.config['ALERT_COOLDOWNS'],
+    loader=lambda: latest_alert_times()  # defined with add_to_db below
+)
+
+# Dropped per user whenever their alerts or cameras change in this process; alerts written by a
+# detection service process are caught by the all-time rollup total, checked on every request
+dashboard_cache = stats_cache(
+    ttl=app.config['DASHBOARD_STATS_TTL'],
+    version=lambda user_id: rollup_count(user_id, 'all')  # defined with add_to_db below
+)
+
+# Initialize detection models (weights are shared through models/model_registry.py and load on first use)
 try:
     fire_det = fire_detection("models/fire.pt", conf=0.60)
     smoke_det = smoke_detection("models/fire.pt", conf=0.70)
@@ -159,23 +295,12 @@ def dash_page():
         cameras = Camera.query.filter_by(user_id=current_user.id).all()
         
         # Get dashboard statistics
-        total_cameras = len(cameras)
-        recent_alerts = Alert.query.filter_by(user_id=current_user.id).filter(
-            Alert.date_time >= datetime.now() - timedelta(hours=24)
-        ).count()
-        
-        critical_alerts = Alert.query.filter_by(
-            user_id=current_user.id, 
-            severity='critical'
-        ).filter(
-            Alert.date_time >= datetime.now() - timedelta(hours=24)
-        ).count()
-        
+        counters, _ = dashboard_cache.get(current_user.id, lambda: dashboard_counters(current_user.id))
         stats = {
-            'total_cameras': total_cameras,
-            'recent_alerts': recent_alerts,
-            'critical_alerts': critical_alerts,
-            'system_status': 'Online' if total_cameras > 0 else 'No Cameras'
+            'total_cameras': len(cameras),
+            'recent_alerts': counters['recent_alerts'],
+            'critical_alerts': counters['critical_alerts'],
+            'system_status': 'Online' if cameras else 'No Cameras'
         }
         
         return render_template('dashboard.html', cameras=cameras, stats=stats)
@@ -216,70 +341,198 @@ def getting_cam_details():
                 'air_quality_monitoring': "Air_quality" in request.form
             }
 
+            # Analysis rate floor; the rate controller never goes below it
+            try:
+                min_fps = max(0.1, float(request.form.get('Min_fps') or 1.0))
+            except ValueError:
+                min_fps = 1.0
+
+            # Optional per-detector cadence overrides, e.g. {"crowd_detection": {"every": 10}}
+            cadence = request.form.get('Cadence', '').strip() or None
+            try:
+                parse_cadences(cadence)
+            except ValueError as e:
+                flash(f'Invalid detector cadence: {str(e)}')
+                return redirect("/manage_camera")
+
+            # Separate inference, display and snapshot resolutions, e.g. "640x480"
+            resolutions = {
+                'inference_resolution': request.form.get('Inference_res', '').strip() or None,
+                'display_resolution': request.form.get('Display_res', '').strip() or None,
+                'snapshot_resolution': request.form.get('Snapshot_res', '').strip() or None
+            }
+            try:
+                for value in resolutions.values():
+                    parse_resolution(value)
+            except ValueError:
+                flash('Invalid resolution: use WIDTHxHEIGHT, e.g. 640x480')
+                return redirect("/manage_camera")
+
+            # Restricted zones for intrusion detection and the region of interest for line inspection
+            zones = request.form.get('Zones', '').strip() or None
+            roi = request.form.get('Roi', '').strip() or None
+            try:
+                parse_zones(zones)
+                parse_roi(roi)
+            except ValueError as e:
+                flash(f'Invalid zone or region of interest: {str(e)}')
+                return redirect("/manage_camera")
+            detection_flags['region'] = roi is not None
+
             camera = Camera.query.filter_by(cam_id=camid, user_id=current_user.id).first()
 
             if camera:
                 # Update existing camera
                 for flag, value in detection_flags.items():
                     setattr(camera, flag, value)
+                camera.min_analysis_fps = min_fps
+                camera.detector_cadence = cadence
+                for column, value in resolutions.items():
+                    setattr(camera, column, value)
+                camera.zones = zones
+                camera.roi = roi
             else:
                 # Create new camera
                 camera = Camera(
                     user_id=current_user.id, 
                     cam_id=camid,
+                    min_analysis_fps=min_fps,
+                    detector_cadence=cadence,
+                    zones=zones,
+                    roi=roi,
+                    **resolutions,
                     **detection_flags
                 )
 
             db.session.add(camera)
             db.session.commit()
+            dashboard_cache.invalidate(current_user.id)
+            update_pipeline(current_user.id, str(camid), camera_settings(camera))
             flash('Camera configuration saved successfully!')
         except Exception as e:
             flash(f'Error saving camera configuration: {str(e)}')
     
     return redirect("/manage_camera")
 
+def alert_page(user_id, args):
+    """
+    One page of a user's alerts, newest first, with keyset pagination on (date_time, id).
+    args may hold camera, type, severity, since and until (ISO date/time; a bare until date
+    is inclusive) filters, the cursor returned with the previous page and a limit.
+    Only listing columns are loaded.
+    Returns (alerts, next_cursor), next_cursor being None on the last page; raises
+    ValueError for malformed arguments.
+    """
+    limit = min(max(int(args.get('limit') or ALERT_PAGE_SIZE), 1), ALERT_PAGE_MAX)
+    query = Alert.query.options(db.load_only(
+        Alert.id, Alert.date_time, Alert.alert_type, Alert.severity, Alert.description,
+        Alert.camera_id, Alert.confidence, Alert.snapshot_key
+    )).filter(Alert.user_id == user_id)
+
+    if args.get('camera'):
+        query = query.filter(Alert.camera_id == args['camera'])
+    if args.get('type'):
+        query = query.filter(Alert.alert_type == args['type'])
+    if args.get('severity'):
+        query = query.filter(Alert.severity == args['severity'])
+    if args.get('since'):
+        query = query.filter(Alert.date_time >= datetime.fromisoformat(args['since']))
+    if args.get('until'):
+        until = datetime.fromisoformat(args['until'])
+        # A bare date includes that whole day
+        if 'T' not in args['until'] and ' ' not in args['until'].strip():
+            until += timedelta(days=1)
+        query = query.filter(Alert.date_time < until)
+
+    # Continue strictly after the last alert of the previous page; unlike OFFSET this
+    # seeks straight into the index however deep the page is
+    if args.get('cursor'):
+        cursor_time, cursor_id = args['cursor'].rsplit('_', 1)
+        cursor_time, cursor_id = datetime.fromisoformat(cursor_time), int(cursor_id)
+        query = query.filter(db.or_(
+            Alert.date_time < cursor_time,
+            db.and_(Alert.date_time == cursor_time, Alert.id < cursor_id)
+        ))
+
+    alerts = query.order_by(Alert.date_time.desc(), Alert.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(alerts) > limit:
+        alerts = alerts[:limit]
+        next_cursor = f"{alerts[-1].date_time.isoformat()}_{alerts[-1].id}"
+    return alerts, next_cursor
+
 @app.route('/notifications')
 @login_required
 def notifications():
+    filters = {name: request.args[name] for name in ALERT_FILTERS if request.args.get(name)}
     try:
-        alerts = Alert.query.filter_by(user_id=current_user.id).order_by(Alert.date_time.desc()).limit(100).all()
-        for alert in alerts:
-            if alert.frame_snapshot:
-                alert.frame_snapshot = base64.b64encode(alert.frame_snapshot).decode('utf-8')
-        return render_template('notifications.html', alerts=alerts)
+        alerts, next_cursor = alert_page(current_user.id, request.args)
+    except ValueError:
+        flash('Invalid alert filter. Dates must look like 2024-01-31 or 2024-01-31T08:00.')
+        return redirect('/notifications')
+    try:
+        cameras = [camera.cam_id for camera in Camera.query.filter_by(user_id=current_user.id).all()]
+        return render_template('notifications.html', alerts=alerts, next_cursor=next_cursor,
+                               filters=filters, cameras=cameras, paged='cursor' in request.args)
     except Exception as e:
         flash(f'Database error: {str(e)}. Please run database migration.')
         return redirect('/dashboard')
 
+@app.route('/api/alerts')
+@login_required
+def api_alerts():
+    """Alerts as JSON; same filters and cursor as /notifications"""
+    try:
+        alerts, next_cursor = alert_page(current_user.id, request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid alert filter: {str(e)}'}), 400
+    return jsonify({
+        'alerts': [{
+            'id': alert.id,
+            'date_time': alert.date_time.isoformat(),
+            'alert_type': alert.alert_type,
+            'severity': alert.severity,
+            'description': alert.description,
+            'camera_id': alert.camera_id,
+            'confidence': alert.confidence,
+            'snapshot_url': url_for('snapshot', key=alert.snapshot_key) if alert.snapshot_key
+                            else url_for('legacy_snapshot', id=alert.id),
+            'thumbnail_url': url_for('snapshot_thumbnail', key=alert.snapshot_key) if alert.snapshot_key
+                             else url_for('legacy_snapshot', id=alert.id)
+        } for alert in alerts],
+        'next_cursor': next_cursor
+    })
+
 @app.route('/analytics')
 @login_required
 def analytics():
     try:
-        # Get analytics data
+        # Get analytics data from the rollups, so page cost does not grow with alert history
         alerts_by_type = db.session.query(
-            Alert.alert_type, 
-            db.func.count(Alert.id).label('count')
-        ).filter_by(user_id=current_user.id).group_by(Alert.alert_type).all()
+            AlertRollup.alert_type, 
+            db.func.sum(AlertRollup.alert_count).label('count')
+        ).filter_by(user_id=current_user.id, granularity='all').group_by(AlertRollup.alert_type).all()
         
         alerts_by_severity = db.session.query(
-            Alert.severity,
-            db.func.count(Alert.id).label('count')
-        ).filter_by(user_id=current_user.id).group_by(Alert.severity).all()
+            AlertRollup.severity,
+            db.func.sum(AlertRollup.alert_count).label('count')
+        ).filter_by(user_id=current_user.id, granularity='all').group_by(AlertRollup.severity).all()
         
         # Recent trends (last 7 days)
         week_ago = datetime.now() - timedelta(days=7)
         daily_alerts = db.session.query(
-            db.func.date(Alert.date_time).label('date'),
-            db.func.count(Alert.id).label('count')
+            AlertRollup.bucket,
+            db.func.sum(AlertRollup.alert_count).label('count')
         ).filter(
-            Alert.user_id == current_user.id,
-            Alert.date_time >= week_ago
-        ).group_by(db.func.date(Alert.date_time)).all()
+            AlertRollup.user_id == current_user.id,
+            AlertRollup.granularity == 'day',
+            AlertRollup.bucket >= week_ago.strftime(ROLLUP_BUCKETS['day'])
+        ).group_by(AlertRollup.bucket).order_by(AlertRollup.bucket).all()
         
         analytics_data = {
-            'alerts_by_type': [{'type': item[0], 'count': item[1]} for item in alerts_by_type],
-            'alerts_by_severity': [{'severity': item[0], 'count': item[1]} for item in alerts_by_severity],
-            'daily_alerts': [{'date': str(item[0]), 'count': item[1]} for item in daily_alerts]
+            'alerts_by_type': [{'type': item[0], 'count': item[1]} for item in alerts_by_type if item[1]],
+            'alerts_by_severity': [{'severity': item[0], 'count': item[1]} for item in alerts_by_severity if item[1]],
+            'daily_alerts': [{'date': item[0][:10], 'count': item[1]} for item in daily_alerts if item[1]]
         }
         
         return render_template('analytics.html', analytics=analytics_data)
@@ -287,38 +540,122 @@ def analytics():
         flash(f'Error loading analytics: {str(e)}')
         return redirect('/dashboard')
 
+def dashboard_counters(user_id):
+    """Camera and alert counts shown on the dashboard, cached per user by dashboard_cache"""
+    now = datetime.now()
+    day_ago = now - timedelta(hours=24)
+    return {
+        'total_cameras': Camera.query.filter_by(user_id=user_id).count(),
+        'alerts_today': rollup_count(user_id, 'day', since=now),
+        'recent_alerts': rollup_count(user_id, 'minute', since=day_ago),
+        'critical_alerts': rollup_count(user_id, 'minute', since=day_ago, severity='critical')
+    }
+
 @app.route('/api/dashboard_stats')
 @login_required
 def dashboard_stats():
     try:
-        cameras = Camera.query.filter_by(user_id=current_user.id).count()
-        alerts_today = Alert.query.filter_by(user_id=current_user.id).filter(
-            Alert.date_time >= datetime.now().replace(hour=0, minute=0, second=0)
-        ).count()
-        
-        critical_alerts = Alert.query.filter_by(
-            user_id=current_user.id,
-            severity='critical'
-        ).filter(
-            Alert.date_time >= datetime.now() - timedelta(hours=24)
-        ).count()
+        counters, etag = dashboard_cache.get(current_user.id, lambda: dashboard_counters(current_user.id))
         
-        return jsonify({
-            'total_cameras': cameras,
-            'alerts_today': alerts_today,
-            'critical_alerts': critical_alerts,
+        response = jsonify({
+            'total_cameras': counters['total_cameras'],
+            'alerts_today': counters['alerts_today'],
+            'critical_alerts': counters['critical_alerts'],
             'system_status': 'Online'
         })
+        # Browsers revalidate on every poll; unchanged counters cost a 304 with no body
+        response.set_etag(etag)
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/dashboard_cache')
+@login_required
+def dashboard_cache_stats():
+    """Hit rate of the in-memory dashboard counters"""
+    return jsonify(dashboard_cache.stats())
+
+@app.route('/api/model_memory')
+@login_required
+def model_memory():
+    return jsonify({'models': memory_report(), 'inference_batching': inference_batcher.stats()})
+
+@app.route('/api/alert_queue')
+@login_required
+def alert_queue_stats():
+    """Depth of the background alert writer's queue and what it has written or dropped"""
+    return jsonify({**alert_queue.stats(), 'cooldowns': alert_cooldowns.stats()})
+
+@app.route('/api/pipeline_stats')
+@login_required
+def pipeline_stats():
+    """Analysis rate, latency and dropped frames per camera"""
+    stats = {}
+    for camera in Camera.query.filter_by(user_id=current_user.id).all():
+        cam_id = str(camera.cam_id)
+        pipeline = find_pipeline(current_user.id, cam_id)
+        if pipeline is not None and pipeline.running:
+            stats[cam_id] = pipeline.stats()
+        else:
+            stats[cam_id] = read_published_stats(published_frame_path(current_user.id, cam_id)
+                                                 or live_frame_path(current_user.id, cam_id))
+    return jsonify(stats)
+
+def cached_image(data_or_path, etag):
+    """JPEG response with a strong ETag, long-lived private caching and 304 support"""
+    response = send_file(data_or_path, mimetype='image/jpeg', etag=etag, conditional=True,
+                         max_age=SNAPSHOT_MAX_AGE)
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    return response
+
+def send_snapshot(key, thumbnail):
+    if Alert.query.filter_by(snapshot_key=key, user_id=current_user.id).first() is None:
+        abort(404)
+    try:
+        path = snapshots.path(key, thumbnail)
+    except ValueError:
+        abort(404)
+    if not os.path.exists(path):
+        abort(404)
+    # The key is the content hash, so it doubles as the ETag
+    return cached_image(path, f"{key}-thumb" if thumbnail else key)
+
+@app.route('/snapshots/<key>')
+@login_required
+def snapshot(key):
+    return send_snapshot(key, thumbnail=False)
+
+@app.route('/snapshots/<key>/thumbnail')
+@login_required
+def snapshot_thumbnail(key):
+    return send_snapshot(key, thumbnail=True)
+
+@app.route('/alert_snapshot/<int:id>')
+@login_required
+def legacy_snapshot(id):
+    """Snapshot of an alert not yet moved to the snapshot store"""
+    alert = Alert.query.filter_by(id=id, user_id=current_user.id).first()
+    if alert is None or not alert.frame_snapshot:
+        abort(404)
+    return cached_image(io.BytesIO(alert.frame_snapshot), f"alert-{alert.id}")
+
 @app.route('/delete_notification/<int:id>')         
 @login_required
 def delete_notification(id):
     alert = Alert.query.filter_by(id=id, user_id=current_user.id).first()
     if alert:
+        snapshot_key = alert.snapshot_key
+        update_rollups([alert], delta=-1)
         db.session.delete(alert)
         db.session.commit()
+        dashboard_cache.invalidate(current_user.id)
+        # Identical snapshots are shared; remove the file once no alert points at it
+        if snapshot_key and Alert.query.filter_by(snapshot_key=snapshot_key).first() is None:
+            snapshots.delete(snapshot_key)
         flash('Alert deleted successfully!')
     return redirect("/notifications")
 
@@ -327,8 +664,10 @@ def delete_notification(id):
 def delete_camera(id):
     camera = Camera.query.filter_by(id=id, user_id=current_user.id).first()
     if camera:
+        remove_pipeline(current_user.id, str(camera.cam_id))
         db.session.delete(camera)
         db.session.commit()
+        dashboard_cache.invalidate(current_user.id)
         flash('Camera deleted successfully!')
     return redirect("/manage_camera")
 
@@ -344,24 +683,18 @@ def video_feed(cam_id):
     try:
         camera = Camera.query.filter_by(cam_id=str(cam_id), user_id=current_user.id).first()
         if camera:
+            # Prefer the frames of a running detection service; only analyse in-process without one,
+            # and never when a service is deployed (it may be starting or restarting a worker)
+            live_path = published_frame_path(current_user.id, str(cam_id))
+            if live_path is not None or not app.config['IN_PROCESS_DETECTION']:
+                return Response(
+                    service_frames(current_user.id, str(cam_id)), 
+                    mimetype='multipart/x-mixed-replace; boundary=frame'
+                )
+
+            pipeline = get_pipeline(current_user.id, str(cam_id), analyze_frame, camera_settings(camera))
             return Response(
-                process_frames(
-                    str(cam_id), 
-                    camera.region,
-                    camera.restricted_zone,
-                    camera.pose_alert,
-                    camera.fire_detection,
-                    camera.smoke_detection,
-                    camera.safety_gear_detection,
-                    camera.enhanced_gear_detection,
-                    camera.intrusion_detection,
-                    camera.leakage_detection,
-                    camera.activity_monitoring,
-                    camera.defect_detection,
-                    camera.crowd_detection,
-                    camera.air_quality_monitoring,
-                    current_user.id
-                ), 
+                pipeline.frames(), 
                 mimetype='multipart/x-mixed-replace; boundary=frame'
             )
         else:
@@ -369,210 +702,402 @@ def video_feed(cam_id):
     except Exception as e:
         return f"Error with camera: {str(e)}"
 
-def add_to_db(results, frame, alert_name, user_id=None, camera_id=None, severity='medium', description='', confidence=0.0):
-    """Enhanced alert logging with additional metadata"""
+def add_to_db(results, frame, alert_name, user_id=None, camera_id=None, severity='medium', description='', confidence=0.0,
+              snapshot_size=None, subject=None):
+    """
+    Queue an alert for the background alert writer; the frame loop never waits on the database.
+    snapshot_size is the (width, height) stored. The cooldown for the alert type is checked in
+    memory, per subject (a track or zone) when one is given.
+    """
     if results[0]:  # If detection found
-        with app.app_context():
-            try:
-                latest_alert = Alert.query.filter_by(
-                    alert_type=alert_name, 
-                    user_id=user_id,
-                    camera_id=camera_id
-                ).order_by(Alert.date_time.desc()).first()
-
-                # Only add new alert if last one was more than 30 seconds ago
-                if (latest_alert is None) or ((datetime.now() - latest_alert.date_time) > timedelta(seconds=30)):
-                    new_alert = Alert(
-                        date_time=datetime.now(), 
-                        alert_type=alert_name,
-                        severity=severity,
-                        description=description,
-                        frame_snapshot=cv2.imencode('.jpg', frame)[1].tobytes(),
-                        user_id=user_id,
-                        camera_id=camera_id,
-                        confidence=confidence
-                    )
-                    db.session.add(new_alert)
-                    db.session.commit()
-            except Exception as e:
-                print(f"Error adding alert to database: {e}")
-
-def process_frames(camid, region, flag_r_zone=False, flag_pose_alert=False, 
-                  flag_fire=False, flag_smoke=False, flag_gear=False, 
-                  flag_enhanced_gear=False, flag_intrusion=False, flag_leakage=False,
-                  flag_activity=False, flag_defect=False, flag_crowd=False,
-                  flag_air_quality=False, user_id=None):
-    """Enhanced frame processing with all detection features"""
-    
-    # Initialize camera
-    if len(camid) == 1:
-        cap = cv2.VideoCapture(int(camid))
-    else:
-        address = f"http://{camid}/video"
-        cap = cv2.VideoCapture(address)
-
-    if not cap.isOpened():
-        raise Exception("Failed to open camera")
-    
-    cap.set(cv2.CAP_PROP_FPS, 30)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        emitted_at = alert_cooldowns.should_emit(user_id, camera_id, alert_name, subject)
+        if emitted_at is not None:
+            # A dropped or unwritten alert hands its cooldown back through release_cooldowns
+            alert_queue.submit({
+                'date_time': datetime.now(),
+                'subject': subject,
+                'emitted_at': emitted_at,
+                'alert_type': alert_name,
+                'severity': severity,
+                'description': description,
+                'frame': frame.copy(),
+                'snapshot_size': snapshot_size,
+                'user_id': user_id,
+                'camera_id': camera_id,
+                'confidence': confidence
+            })
+
+def release_cooldowns(alerts):
+    """Alert writer callback for alerts that were dropped or failed to write"""
+    for item in alerts:
+        alert_cooldowns.release(item['user_id'], item['camera_id'], item['alert_type'],
+                                item.get('subject'), item.get('emitted_at'))
+
+def write_alerts(batch):
+    """Alert writer callback: store snapshots and insert a batch of alerts in one transaction"""
+    with app.app_context():
+        try:
+            alerts = []
+            for item in batch:
+                snapshot = resize_to(item['frame'], item['snapshot_size'])
+                snapshot_key, snapshot_bytes = snapshots.put_frame(snapshot)
+                alerts.append(Alert(
+                    date_time=item['date_time'], 
+                    alert_type=item['alert_type'],
+                    severity=item['severity'],
+                    description=item['description'],
+                    snapshot_key=snapshot_key,
+                    snapshot_width=snapshot.shape[1],
+                    snapshot_height=snapshot.shape[0],
+                    snapshot_bytes=snapshot_bytes,
+                    user_id=item['user_id'],
+                    camera_id=item['camera_id'],
+                    confidence=item['confidence']
+                ))
+            db.session.add_all(alerts)
+            update_rollups(alerts)
+            prune_minute_rollups()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+    dashboard_cache.invalidate(*{item['user_id'] for item in batch})
+
+def update_rollups(alerts, delta=1):
+    """Add delta to the rollup counts of each alert at every granularity, in the current transaction"""
+    counts = Counter()
+    for alert in alerts:
+        for granularity, bucket_format in ROLLUP_BUCKETS.items():
+            counts[(granularity, alert.date_time.strftime(bucket_format), alert.user_id, alert.camera_id or '',
+                    alert.alert_type, alert.severity or 'medium')] += delta
+    # Decrements only touch existing rows and stop at zero, in case the history was never backfilled
+    for (granularity, bucket, user_id, camera_id, alert_type, severity), count in counts.items():
+        if count < 0:
+            AlertRollup.query.filter_by(granularity=granularity, bucket=bucket, user_id=user_id, camera_id=camera_id,
+                                        alert_type=alert_type, severity=severity).update(
+                {'alert_count': db.func.max(AlertRollup.alert_count + count, 0)}, synchronize_session=False)
+    increments = [key + (count,) for key, count in counts.items() if count > 0]
+    if not increments:
+        return
+    statement = sqlite_insert(AlertRollup).values([
+        {'granularity': granularity, 'bucket': bucket, 'user_id': user_id, 'camera_id': camera_id,
+         'alert_type': alert_type, 'severity': severity, 'alert_count': count}
+        for granularity, bucket, user_id, camera_id, alert_type, severity, count in increments
+    ])
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['granularity', 'user_id', 'bucket', 'camera_id', 'alert_type', 'severity'],
+        set_={'alert_count': AlertRollup.alert_count + statement.excluded.alert_count}
+    ))
+
+# Minute rollups only serve the last-24-hour counts; older ones are pruned about hourly
+ROLLUP_MINUTE_RETENTION = timedelta(days=2)
+last_rollup_prune = datetime.min
+
+def prune_minute_rollups():
+    global last_rollup_prune
+    now = datetime.now()
+    if now - last_rollup_prune < timedelta(hours=1):
+        return
+    last_rollup_prune = now
+    cutoff = (now - ROLLUP_MINUTE_RETENTION).strftime(ROLLUP_BUCKETS['minute'])
+    AlertRollup.query.filter(AlertRollup.granularity == 'minute', AlertRollup.bucket < cutoff).delete()
+
+def rollup_count(user_id, granularity, since=None, **filters):
+    """Alerts counted from the rollups, from the bucket holding since onwards"""
+    query = db.session.query(db.func.coalesce(db.func.sum(AlertRollup.alert_count), 0)).filter(
+        AlertRollup.user_id == user_id, AlertRollup.granularity == granularity)
+    if since is not None:
+        query = query.filter(AlertRollup.bucket >= since.strftime(ROLLUP_BUCKETS[granularity]))
+    for column, value in filters.items():
+        query = query.filter(getattr(AlertRollup, column) == value)
+    return query.scalar()
+
+def latest_alert_times():
+    """Latest alert per user, camera and alert type, to warm the cooldown cache"""
+    with app.app_context():
+        return db.session.query(
+            Alert.user_id, Alert.camera_id, Alert.alert_type, db.func.max(Alert.date_time)
+        ).group_by(Alert.user_id, Alert.camera_id, Alert.alert_type).all()
 
-    frame_skip = 2
-    frame_count = 0
+def live_frame_path(user_id, camid, mode=None):
+    """Frame file published for a camera; a classical-only service publishes to its own file"""
+    name = f"{user_id}_{camid}_{mode}.jpg" if mode else f"{user_id}_{camid}.jpg"
+    return os.path.join(LIVE_FRAME_DIR, secure_filename(name))
 
-    # Define restricted zones (example coordinates - should be configurable)
-    restricted_zones = [[(100, 100), (300, 100), (300, 300), (100, 300)]]
+def published_frame_path(user_id, camid):
+    """Freshest frame file a detection service is publishing for a camera, or None"""
+    for path in (live_frame_path(user_id, camid), live_frame_path(user_id, camid, 'classical')):
+        if frame_file_is_fresh(path):
+            return path
+    return None
 
+waiting_jpeg = None
+
+def waiting_frame():
+    """Placeholder shown while the detection service has no frames for a camera"""
+    global waiting_jpeg
+    if waiting_jpeg is None:
+        placeholder = cv2.putText(np.zeros((480, 640, 3), dtype=np.uint8), "Waiting for detection service...",
+                                  (110, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+        waiting_jpeg = cv2.imencode('.jpg', placeholder)[1].tobytes()
+    return waiting_jpeg
+
+def service_frames(user_id, camid, retry_interval=1.0):
+    """Multipart stream of published frames that waits out detection service restarts"""
     while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        frame_count += 1
-        if frame_count % frame_skip != 0:
-            continue
+        path = published_frame_path(user_id, camid)
+        if path is not None:
+            yield from published_frames(path)
+        else:
+            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + waiting_frame() + b'\r\n')
+            time.sleep(retry_interval)
 
-        frame = cv2.resize(frame, (1000, 580))
-        original_frame = frame.copy()
+def camera_settings(camera):
+    """Snapshot a Camera row so pipelines can read its flags outside the request"""
+    return {
+        'cam_id': str(camera.cam_id),
+        'user_id': camera.user_id,
+        'region': camera.region,
+        'restricted_zone': camera.restricted_zone,
+        'pose_alert': camera.pose_alert,
+        'fire_detection': camera.fire_detection,
+        'smoke_detection': camera.smoke_detection,
+        'safety_gear_detection': camera.safety_gear_detection,
+        'enhanced_gear_detection': camera.enhanced_gear_detection,
+        'intrusion_detection': camera.intrusion_detection,
+        'leakage_detection': camera.leakage_detection,
+        'activity_monitoring': camera.activity_monitoring,
+        'defect_detection': camera.defect_detection,
+        'crowd_detection': camera.crowd_detection,
+        'air_quality_monitoring': camera.air_quality_monitoring,
+        'min_analysis_fps': camera.min_analysis_fps or 1.0,
+        'detector_cadence': load_cadences(camera.detector_cadence),
+        'inference_resolution': parse_resolution(camera.inference_resolution),
+        'display_resolution': parse_resolution(camera.display_resolution),
+        'snapshot_resolution': parse_resolution(camera.snapshot_resolution),
+        'restricted_zones': parse_zones(camera.zones),
+        'roi': parse_roi(camera.roi),
+        'target_latency': app.config['ANALYSIS_TARGET_LATENCY'],
+        'cpu_budget': app.config['ANALYSIS_CPU_BUDGET'],
+        'max_analysis_fps': app.config['ANALYSIS_MAX_FPS']
+    }
 
-        try:
-            # Fire Detection
-            if flag_fire:
-                results = fire_det.process(img=frame, flag=True)
-                if results[0]:
-                    add_to_db(results, frame, "fire_detection", user_id, camid, 'critical', 
-                             'Fire detected in monitored area', 0.85)
-
-            # Smoke Detection
-            if flag_smoke:
-                results = smoke_det.process(img=frame, flag=True)
-                if hasattr(results, '__len__') and len(results) >= 3:
-                    detection_found, boxes, types = results
-                    if detection_found:
-                        description = f"Smoke/Fire detected: {', '.join(types)}"
-                        add_to_db((detection_found, boxes), frame, "smoke_detection", user_id, camid, 
-                                 'high', description, 0.75)
-
-            # Basic Gear Detection
-            if flag_gear:
-                results = gear_det.process(img=frame, flag=True)
-                if results[0]:
-                    add_to_db(results, frame, "gear_violation", user_id, camid, 'medium', 
-                             'Safety gear compliance issue detected', 0.70)
-
-            # Enhanced Gear Detection
-            if flag_enhanced_gear:
-                results = enhanced_gear_det.process(img=frame, flag=True)
-                if results[0]:
-                    compliance_data = results[2] if len(results) > 2 else []
-                    non_compliant = [r for r in compliance_data if not r.get('compliant', True)]
-                    description = f"PPE violations: {len(non_compliant)} workers non-compliant"
-                    add_to_db(results, frame, "ppe_violation", user_id, camid, 'high', description, 0.80)
-
-            # Intrusion Detection
-            if flag_intrusion:
-                results = intrusion_det.process(img=frame, flag=True, restricted_zones=restricted_zones)
-                if results[0]:
-                    intrusion_points = results[2] if len(results) > 2 else []
-                    description = f"Unauthorized entry detected: {len(intrusion_points)} intrusion(s)"
-                    add_to_db(results, frame, "intrusion_alert", user_id, camid, 'critical', description, 0.75)
-
-            # Leakage Detection
-            if flag_leakage:
-                results = leakage_det.process(img=frame, flag=True)
-                if results[0]:
-                    leak_type = results[2] if len(results) > 2 else 'Unknown'
-                    description = f"Leakage detected: {leak_type}"
-                    add_to_db(results, frame, "leakage_alert", user_id, camid, 'high', description, 0.70)
-
-            # Activity Monitoring
-            if flag_activity:
-                results = activity_det.process(img=frame, flag=True)
-                if results[0]:
-                    activities = results[2] if len(results) > 2 else []
-                    description = f"Activities detected: {', '.join(activities)}"
-                    add_to_db(results, frame, "activity_alert", user_id, camid, 'low', description, 0.65)
-
-            # Defect Detection
-            if flag_defect:
-                results = defect_det.process(img=frame, flag=True)
-                if results[0]:
-                    defect_count = len(results[1]) if len(results) > 1 else 1
-                    description = f"Product defects detected: {defect_count} items"
-                    add_to_db(results, frame, "defect_alert", user_id, camid, 'medium', description, 0.80)
-
-            # Crowd Detection
-            if flag_crowd:
-                results = crowd_det.process(img=frame, flag=True)
-                if results[0]:
-                    crowd_density = results[2] if len(results) > 2 else 'High'
-                    description = f"Crowd density alert: {crowd_density} density detected"
-                    add_to_db(results, frame, "crowd_alert", user_id, camid, 'medium', description, 0.70)
-
-            # Air Quality Monitoring
-            if flag_air_quality:
-                results = air_quality_det.process(img=frame, flag=True)
-                if results[0]:
-                    air_quality = results[2] if len(results) > 2 else 'Poor'
-                    description = f"Air quality alert: {air_quality} air quality detected"
-                    add_to_db(results, frame, "air_quality_alert", user_id, camid, 'medium', description, 0.60)
-
-            # L-pose Detection (Emergency Alert)
-            if flag_pose_alert:
-                pose_frame, detected = detect_l_pose(frame.copy())
-                if detected:
-                    with app.app_context():
-                        try:
-                            latest_alert = Alert.query.filter_by(
-                                alert_type="emergency_pose", 
-                                user_id=user_id,
-                                camera_id=camid
-                            ).order_by(Alert.date_time.desc()).first()
-                            
-                            if (latest_alert is None) or ((datetime.now() - latest_alert.date_time) > timedelta(minutes=1)):
-                                new_alert = Alert(
-                                    date_time=datetime.now(), 
-                                    alert_type="emergency_pose",
-                                    severity='critical',
-                                    description='Emergency L-pose detected - immediate assistance required',
-                                    frame_snapshot=cv2.imencode('.jpg', pose_frame)[1].tobytes(),
-                                    user_id=user_id,
-                                    camera_id=camid,
-                                    confidence=0.90
-                                )
-                                db.session.add(new_alert)
-                                db.session.commit()
-                        except Exception as e:
-                            print(f"Error adding pose alert: {e}")
-                frame = pose_frame
+def analyze_frame(frame, settings, state=None, report=None):
+    """
+    Run the enabled detectors that are due on this frame and return the annotated frame.
+    state is the camera pipeline's per-camera dict; report, when given, is called with
+    the frame_context once detection has finished.
+    """
+    camid = settings['cam_id']
+    user_id = settings['user_id']
+
+    # Per-detector cadence and priority throttling for this camera
+    if state is None:
+        state = {}
+    scheduler = state.get('scheduler')
+    if scheduler is None:
+        scheduler = state['scheduler'] = detector_scheduler(settings.get('detector_cadence'))
+    elif scheduler.cadences_source is not settings.get('detector_cadence'):
+        scheduler.configure(settings.get('detector_cadence'))
 
+    # Static scenes skip the detectors whose cadence is gated on motion
+    gate = state.get('motion_gate')
+    if gate is None:
+        gate = state['motion_gate'] = motion_gate()
+    scheduler.next_frame(overloaded=state.get('overloaded', False), motion=gate.update(frame))
+
+    def due(detector):
+        return bool(settings.get(detector)) and scheduler.should_run(detector)
+
+    flag_pose_alert = due('pose_alert')
+    flag_fire = due('fire_detection')
+    flag_smoke = due('smoke_detection')
+    flag_gear = due('safety_gear_detection')
+    flag_enhanced_gear = due('enhanced_gear_detection')
+    flag_intrusion = due('intrusion_detection')
+    flag_leakage = due('leakage_detection')
+    flag_activity = due('activity_monitoring')
+    flag_defect = due('defect_detection')
+    flag_crowd = due('crowd_detection')
+    flag_air_quality = due('air_quality_monitoring')
+
+    # Detect on the captured frame, or one downscaled straight to the inference resolution;
+    # YOLO letterboxes it itself and returns boxes in this frame's coordinates
+    frame = resize_to(frame, settings.get('inference_resolution'))
+    snapshot_size = settings.get('snapshot_resolution')
+    height, width = frame.shape[:2]
+
+    # Camera's restricted zones, scaled to this frame
+    restricted_zones = scale_zones(settings.get('restricted_zones') or DEFAULT_RESTRICTED_ZONES, width, height)
+
+    original_frame = frame.copy()
+    # Shared inference cache: each model runs at most once on this frame
+    context = frame_context(original_frame, scheduler=inference_batcher)
+
+    # Line inspection only looks inside the region of interest. roi_frame is a view into frame,
+    # so boxes drawn on it land in place on the full frame.
+    if flag_leakage or flag_defect:
+        x1, y1, x2, y2 = roi_bounds(settings.get('roi'), width, height)
+        roi_frame = frame[y1:y2, x1:x2]
+        # Without an ROI the whole frame is inspected; share its gray, HSV and blur with the other detectors
+        roi_context = context if settings.get('roi') is None else frame_context(original_frame[y1:y2, x1:x2])
+
+    # Person detectors share one tracker: detection runs on keyframes, tracks are propagated in between
+    if flag_intrusion or flag_crowd or flag_activity:
+        tracker = state.get('person_tracker')
+        if tracker is None:
+            tracker = state['person_tracker'] = person_tracker()
+        try:
+            if tracker.keyframe_due():
+                min_conf = min(intrusion_det.confidence, crowd_det.confidence, activity_det.confidence)
+                people = context.arrays(intrusion_det.model).filter(classes=[0], min_conf=min_conf)
+                tracker.update(people.xyxy, people.conf)
+            else:
+                tracker.propagate()
+            context.tracks = tracker.visible()
         except Exception as e:
-            print(f"Error in detection processing: {e}")
-            # Continue with basic frame display even if detection fails
+            print(f"Error tracking people: {e}")
+
+    try:
+        # Fire Detection
+        if flag_fire:
+            results = fire_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                add_to_db(results, frame, "fire_detection", user_id, camid, 'critical', 
+                         'Fire detected in monitored area', 0.85,
+                         snapshot_size=snapshot_size)
+
+        # Smoke Detection
+        if flag_smoke:
+            results = smoke_det.process(img=frame, flag=True, context=context)
+            if hasattr(results, '__len__') and len(results) >= 3:
+                detection_found, boxes, types = results
+                if detection_found:
+                    description = f"Smoke/Fire detected: {', '.join(types)}"
+                    add_to_db((detection_found, boxes), frame, "smoke_detection", user_id, camid, 
+                             'high', description, 0.75, snapshot_size=snapshot_size)
+
+        # Basic Gear Detection
+        if flag_gear:
+            results = gear_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                add_to_db(results, frame, "gear_violation", user_id, camid, 'medium', 
+                         'Safety gear compliance issue detected', 0.70,
+                         snapshot_size=snapshot_size)
 
-        # Add timestamp and camera info
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        cv2.putText(frame, f"Camera: {camid} | {timestamp}", (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+        # Enhanced Gear Detection
+        if flag_enhanced_gear:
+            results = enhanced_gear_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                compliance_data = results[2] if len(results) > 2 else []
+                non_compliant = [r for r in compliance_data if not r.get('compliant', True)]
+                description = f"PPE violations: {len(non_compliant)} workers non-compliant"
+                add_to_db(results, frame, "ppe_violation", user_id, camid, 'high', description, 0.80,
+                         snapshot_size=snapshot_size)
 
-        # Add system status overlay
-        status_text = "AI MONITORING ACTIVE"
-        cv2.putText(frame, status_text, (10, frame.shape[0] - 20), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+        # Intrusion Detection
+        if flag_intrusion:
+            results = intrusion_det.process(img=frame, flag=True, restricted_zones=restricted_zones,
+                                          context=context)
+            if results[0]:
+                intrusion_points = results[2] if len(results) > 2 else []
+                description = f"Unauthorized entry detected: {len(intrusion_points)} intrusion(s)"
+                # One cooldown per intruding person (or per zone when people are not tracked)
+                for subject in sorted(set(results[3] if len(results) > 3 else [None]), key=str):
+                    add_to_db(results, frame, "intrusion_alert", user_id, camid, 'critical', description, 0.75,
+                             snapshot_size=snapshot_size, subject=subject)
 
-        # Encode and yield frame
-        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        # Leakage Detection
+        if flag_leakage:
+            results = leakage_det.process(img=roi_frame, flag=True, context=roi_context)
+            if results[0]:
+                leak_type = results[2] if len(results) > 2 else 'Unknown'
+                description = f"Leakage detected: {leak_type}"
+                add_to_db(results, frame, "leakage_alert", user_id, camid, 'high', description, 0.70,
+                         snapshot_size=snapshot_size)
 
-    cap.release()
+        # Activity Monitoring
+        if flag_activity:
+            results = activity_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                activities = results[2] if len(results) > 2 else []
+                description = f"Activities detected: {', '.join(activities)}"
+                add_to_db(results, frame, "activity_alert", user_id, camid, 'low', description, 0.65,
+                         snapshot_size=snapshot_size)
+
+        # Defect Detection
+        if flag_defect:
+            results = defect_det.process(img=roi_frame, flag=True, context=roi_context)
+            if results[0]:
+                defect_count = len(results[1]) if len(results) > 1 else 1
+                description = f"Product defects detected: {defect_count} items"
+                add_to_db(results, frame, "defect_alert", user_id, camid, 'medium', description, 0.80,
+                         snapshot_size=snapshot_size)
+
+        # Crowd Detection
+        if flag_crowd:
+            results = crowd_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                crowd_density = results[2] if len(results) > 2 else 'High'
+                description = f"Crowd density alert: {crowd_density} density detected"
+                add_to_db(results, frame, "crowd_alert", user_id, camid, 'medium', description, 0.70,
+                         snapshot_size=snapshot_size)
+
+        # Air Quality Monitoring
+        if flag_air_quality:
+            results = air_quality_det.process(img=frame, flag=True, context=context)
+            if results[0]:
+                air_quality = results[2] if len(results) > 2 else 'Poor'
+                description = f"Air quality alert: {air_quality} air quality detected"
+                add_to_db(results, frame, "air_quality_alert", user_id, camid, 'medium', description, 0.60,
+                         snapshot_size=snapshot_size)
+
+        # L-pose Detection (Emergency Alert)
+        if flag_pose_alert:
+            # Imported on demand so workers without pose alerts never load mediapipe
+            from models.pose import detect_l_pose
+            pose_frame, detected = detect_l_pose(frame.copy())
+            add_to_db((detected,), pose_frame, "emergency_pose", user_id, camid, 'critical',
+                      'Emergency L-pose detected - immediate assistance required', 0.90,
+                      snapshot_size=snapshot_size)
+            frame = pose_frame
+
+    except Exception as e:
+        print(f"Error in detection processing: {e}")
+        # Continue with basic frame display even if detection fails
+
+    if report is not None:
+        report(context)
+
+    # Boxes were drawn in inference coordinates; one resize maps them to the display resolution
+    frame = resize_to(frame, settings.get('display_resolution'))
+
+    # Add timestamp and camera info
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cv2.putText(frame, f"Camera: {camid} | {timestamp}", (10, 30), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+    # Add system status overlay
+    status_text = "AI MONITORING ACTIVE"
+    cv2.putText(frame, status_text, (10, frame.shape[0] - 20), 
+               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+
+    return frame
 
 if __name__ == "__main__":
     with app.app_context():
         try:
             db.create_all()
             print("✅ Database tables created successfully!")
+            # create_all() leaves a new rollup table empty; count the existing alert history into it
+            connection = db.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                if not rollups_current(cursor):
+                    rebuild_rollups(cursor)
+                    connection.commit()
+            finally:
+                connection.close()
         except Exception as e:
             print(f"❌ Database creation error: {e}")
             print("Please run the migration script: python migrate_database.py")
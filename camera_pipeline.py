@@ -0,0 +1,371 @@
+import json
+import os
+import threading
+import time
+import cv2
+
+from rate_controller import rate_controller
+
+# Resolution requested from every camera
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+
+def open_capture(camid):
+    """Open a local camera index or an IP camera stream"""
+    if len(camid) == 1:
+        cap = cv2.VideoCapture(int(camid))
+    else:
+        address = f"http://{camid}/video"
+        cap = cv2.VideoCapture(address)
+
+    if not cap.isOpened():
+        raise Exception("Failed to open camera")
+
+    cap.set(cv2.CAP_PROP_FPS, 30)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+    return cap
+
+
+def parse_resolution(text):
+    """'WIDTHxHEIGHT' as a (width, height) tuple, None when blank; raises ValueError when malformed"""
+    if not text:
+        return None
+    width, height = (int(value) for value in text.lower().split('x'))
+    if width <= 0 or height <= 0:
+        raise ValueError("Resolution must be positive, e.g. 640x480")
+    return (width, height)
+
+
+def resize_to(frame, size):
+    """Scale frame straight to size; None or a matching size returns the frame unchanged"""
+    if size is None or (frame.shape[1], frame.shape[0]) == tuple(size):
+        return frame
+    interpolation = cv2.INTER_AREA if size[0] < frame.shape[1] else cv2.INTER_LINEAR
+    return cv2.resize(frame, tuple(size), interpolation=interpolation)
+
+
+class capture_reader:
+    """
+    Reads a capture on its own thread and only ever hands out the freshest frame,
+    so a slow detection loop cannot make the stream fall behind real time.
+    Frames nobody is waiting for are grabbed but never decoded.
+
+    Args:
+    cap: opened cv2.VideoCapture.
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.condition = threading.Condition()
+        self.running = True
+        self.waiting = False
+        self.frame = None
+        self.frame_time = 0.0
+        self.seq = 0
+        self.grabbed = 0
+        self.dropped = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running:
+            if not self.cap.grab():
+                break
+            self.grabbed += 1
+
+            with self.condition:
+                wanted = self.waiting
+            if not wanted:
+                self.dropped += 1
+                continue
+
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                break
+            with self.condition:
+                self.frame = frame
+                self.frame_time = time.time()
+                self.seq += 1
+                self.waiting = False
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def read(self, timeout=10.0):
+        """Block until a frame newer than the last one read is decoded"""
+        with self.condition:
+            last_seq = self.seq
+            self.waiting = True
+            self.condition.wait_for(lambda: self.seq != last_seq or not self.running, timeout)
+            if self.seq == last_seq:
+                return False, None
+            return True, self.frame
+
+    def release(self):
+        self.running = False
+        self.thread.join(timeout=2.0)
+        self.cap.release()
+
+
+class camera_pipeline:
+    """
+    Shared capture and analysis loop for a single camera.
+    One capture and one detection pass serve any number of viewers,
+    so CPU usage does not grow with the number of open streams.
+
+    Args:
+    camid: camera index or IP address.
+    analyze: callable(frame, settings, state) returning the annotated frame; state is a
+        per-camera dict that survives between frames.
+    settings: detection flags and analysis rate limits for this camera.
+    idle_timeout: seconds to keep running after the last viewer leaves.
+    keep_alive: keep running without viewers (headless detection service).
+    publish_path: file the latest annotated JPEG is written to for other processes.
+    capture_factory: callable(camid) returning an object with the VideoCapture read/release API.
+    """
+
+    def __init__(self, camid, analyze, settings=None, idle_timeout=10.0,
+                 keep_alive=False, publish_path=None, capture_factory=open_capture):
+        self.camid = camid
+        self.analyze = analyze
+        self.capture_factory = capture_factory
+        self.idle_timeout = idle_timeout
+        self.keep_alive = keep_alive
+        self.publish_path = publish_path
+        self.stats_path = os.path.splitext(publish_path)[0] + '.json' if publish_path else None
+        self.last_stats_write = 0.0
+        self.controller = rate_controller()
+        self.update_settings(settings or {})
+
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.viewers = 0
+        self.last_viewer_time = time.time()
+        self.frame_id = 0
+        self.frame_bytes = None
+        self.error = None
+        self.reader = None
+        self.state = {}
+
+    def update_settings(self, settings):
+        """Swap detection flags and rate limits without restarting the capture"""
+        self.settings = settings
+        self.controller.configure(
+            target_latency=settings.get('target_latency'),
+            cpu_budget=settings.get('cpu_budget'),
+            min_fps=settings.get('min_analysis_fps'),
+            max_fps=settings.get('max_analysis_fps')
+        )
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+            self.error = None
+            self.last_viewer_time = time.time()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def is_idle(self):
+        return (not self.keep_alive and self.viewers == 0 and
+                time.time() - self.last_viewer_time > self.idle_timeout)
+
+    def publish(self, frame):
+        """Encode the annotated frame once and wake every viewer"""
+        _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 75])
+        frame_bytes = buffer.tobytes()
+        with self.condition:
+            self.frame_bytes = frame_bytes
+            self.frame_id += 1
+            self.condition.notify_all()
+
+        if self.publish_path:
+            try:
+                write_frame_file(self.publish_path, frame_bytes)
+            except OSError as e:
+                print(f"Error publishing frame for camera {self.camid}: {e}")
+
+    def run(self):
+        try:
+            cap = self.capture_factory(self.camid)
+        except Exception as e:
+            print(f"Error opening camera {self.camid}: {e}")
+            self.error = str(e)
+            self.stop()
+            return
+
+        # Real captures get a reader thread; ring-buffer captures already serve the newest frame
+        if hasattr(cap, 'grab'):
+            cap = capture_reader(cap)
+        self.reader = cap
+        dropped = getattr(cap, 'dropped', 0)
+
+        try:
+            while self.running and not self.is_idle():
+                # Sleep off the rest of this frame's slot, then take the freshest frame
+                delay = self.controller.delay()
+                if delay > 0:
+                    with self.condition:
+                        self.condition.wait_for(lambda: not self.running, delay)
+                    continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                self.controller.start_frame()
+                captured = getattr(cap, 'frame_time', 0.0) or time.time()
+                started = time.time()
+                self.state['overloaded'] = self.controller.overloaded()
+                annotated = self.analyze(frame, self.settings, self.state)
+                process_time = time.time() - started
+                self.publish(annotated)
+
+                total_dropped = getattr(cap, 'dropped', 0)
+                self.controller.record(process_time, time.time() - captured, total_dropped - dropped)
+                dropped = total_dropped
+                self.write_stats()
+        except Exception as e:
+            print(f"Error in camera pipeline {self.camid}: {e}")
+            self.error = str(e)
+        finally:
+            cap.release()
+            self.stop()
+
+    def stats(self):
+        return {
+            'running': self.running,
+            'viewers': self.viewers,
+            'frames_analysed': self.frame_id,
+            'frames_dropped': getattr(self.reader, 'dropped', 0),
+            **self.controller.stats(),
+            # Per-camera helpers kept in state (detector scheduler...) report their own numbers
+            **{name: item.stats() for name, item in list(self.state.items()) if hasattr(item, 'stats')}
+        }
+
+    def write_stats(self, interval=1.0):
+        """Publish stats beside the frame file so the web process can show them"""
+        if not self.stats_path or time.time() - self.last_stats_write < interval:
+            return
+        self.last_stats_write = time.time()
+        try:
+            with open(self.stats_path + '.tmp', 'w') as f:
+                json.dump(self.stats(), f)
+            os.replace(self.stats_path + '.tmp', self.stats_path)
+        except OSError as e:
+            print(f"Error publishing stats for camera {self.camid}: {e}")
+
+    def frames(self):
+        """Multipart JPEG stream for one viewer"""
+        with self.condition:
+            self.viewers += 1
+        self.start()
+
+        last_id = 0
+        try:
+            while True:
+                with self.condition:
+                    self.condition.wait_for(
+                        lambda: self.frame_id != last_id or not self.running, timeout=5.0)
+                    if self.frame_id == last_id:
+                        if not self.running:
+                            break
+                        continue
+                    last_id = self.frame_id
+                    frame_bytes = self.frame_bytes
+                yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        finally:
+            with self.condition:
+                self.viewers -= 1
+                self.last_viewer_time = time.time()
+
+
+def write_frame_file(path, frame_bytes):
+    """Atomically replace the published frame so readers never see a partial JPEG"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(frame_bytes)
+    os.replace(tmp_path, path)
+
+
+def frame_file_is_fresh(path, max_age=5.0):
+    try:
+        return time.time() - os.path.getmtime(path) < max_age
+    except OSError:
+        return False
+
+
+def published_frames(path, interval=0.03, max_age=5.0):
+    """Multipart JPEG stream read from a frame file published by the detection service"""
+    last_mtime = None
+    while frame_file_is_fresh(path, max_age):
+        try:
+            mtime = os.path.getmtime(path)
+            if mtime != last_mtime:
+                with open(path, 'rb') as f:
+                    frame_bytes = f.read()
+                last_mtime = mtime
+                yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        except OSError:
+            pass
+        time.sleep(interval)
+
+
+pipelines = {}
+pipelines_lock = threading.Lock()
+
+
+def get_pipeline(user_id, camid, analyze, settings):
+    """Return the running pipeline for a camera, creating it on first use"""
+    key = (user_id, camid)
+    with pipelines_lock:
+        pipeline = pipelines.get(key)
+        if pipeline is None:
+            pipeline = camera_pipeline(camid, analyze, settings)
+            pipelines[key] = pipeline
+        else:
+            pipeline.update_settings(settings)
+    return pipeline
+
+
+def update_pipeline(user_id, camid, settings):
+    """Push new detection flags to a running pipeline, if any"""
+    with pipelines_lock:
+        pipeline = pipelines.get((user_id, camid))
+    if pipeline is not None:
+        pipeline.update_settings(settings)
+
+
+def find_pipeline(user_id, camid):
+    with pipelines_lock:
+        return pipelines.get((user_id, camid))
+
+
+def read_published_stats(path, max_age=5.0):
+    """Stats written by a detection service pipeline, or None when it is not running"""
+    stats_path = os.path.splitext(path)[0] + '.json'
+    if not frame_file_is_fresh(stats_path, max_age):
+        return None
+    try:
+        with open(stats_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def remove_pipeline(user_id, camid):
+    with pipelines_lock:
+        pipeline = pipelines.pop((user_id, camid), None)
+    if pipeline is not None:
+        pipeline.stop()
@@ -0,0 +1,51 @@
+import json
+
+# Zones and regions of interest are stored as fractions of the frame width and
+# height, so they stay valid whatever inference resolution a camera uses.
+
+
+def parse_point(point):
+    if not isinstance(point, (list, tuple)) or len(point) != 2:
+        raise ValueError("Points must be [x, y] pairs")
+    x, y = float(point[0]), float(point[1])
+    if not (0.0 <= x <= 1.0 and 0.0 <= y <= 1.0):
+        raise ValueError("Coordinates must be fractions of the frame between 0 and 1")
+    return (x, y)
+
+
+def parse_zones(text):
+    """Restricted zones stored as a JSON list of polygons; raises ValueError when malformed"""
+    if not text:
+        return []
+    zones = json.loads(text)
+    if not isinstance(zones, list) or not all(isinstance(zone, list) and len(zone) >= 3 for zone in zones):
+        raise ValueError("Zones must be a list of polygons with at least three points each")
+    return [tuple(parse_point(point) for point in zone) for zone in zones]
+
+
+def parse_roi(text):
+    """Region of interest stored as 'x1,y1,x2,y2'; None when blank, ValueError when malformed"""
+    if not text:
+        return None
+    values = [float(value) for value in text.split(',')]
+    if len(values) != 4:
+        raise ValueError("Region of interest must be x1,y1,x2,y2")
+    x1, y1 = parse_point(values[:2])
+    x2, y2 = parse_point(values[2:])
+    if x2 <= x1 or y2 <= y1:
+        raise ValueError("Region of interest must have x2 > x1 and y2 > y1")
+    return (x1, y1, x2, y2)
+
+
+def scale_zones(zones, width, height):
+    """Zone polygons in pixel coordinates of a width x height frame"""
+    return [[(int(x * width), int(y * height)) for x, y in zone] for zone in zones]
+
+
+def roi_bounds(roi, width, height):
+    """Pixel (x1, y1, x2, y2) of a region of interest; the whole frame when roi is None"""
+    if roi is None:
+        return (0, 0, width, height)
+    x1, y1, x2, y2 = roi
+    return (int(x1 * width), int(y1 * height), max(int(x2 * width), int(x1 * width) + 1),
+            max(int(y2 * height), int(y1 * height) + 1))
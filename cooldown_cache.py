@@ -0,0 +1,92 @@
+import threading
+import time
+
+
+class cooldown_cache:
+    """
+    Remembers when each alert was last emitted so cooldowns are decided in memory,
+    before anything touches the database.
+    Keys are (user_id, camera_id, alert_type, subject); subject tells tracked people
+    or zones apart within one alert type and is None for camera-wide alerts.
+
+    Args:
+    windows: seconds between two alerts per alert type; 'default' covers the other types.
+    loader: called once, on first use, for (user_id, camera_id, alert_type, latest datetime)
+            rows that warm the cache with alerts already in the database.
+    max_entries: size at which expired entries are pruned.
+    """
+
+    def __init__(self, windows=None, loader=None, max_entries=10000):
+        self.windows = dict(windows or {})
+        self.loader = loader
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.last_emitted = {}
+        self.warmed = {}
+        self.emitted = 0
+        self.suppressed = 0
+        self.released = 0
+
+    def window(self, alert_type):
+        return self.windows.get(alert_type, self.windows.get('default', 30))
+
+    def warm(self):
+        loader, self.loader = self.loader, None
+        try:
+            for user_id, camera_id, alert_type, latest in loader():
+                if latest is not None:
+                    self.warmed[(user_id, camera_id, alert_type)] = latest.timestamp()
+        except Exception as e:
+            print(f"Error warming alert cooldowns from database: {e}")
+
+    def should_emit(self, user_id, camera_id, alert_type, subject=None):
+        """
+        The emission time when the alert is outside its cooldown, None when it is suppressed.
+        The emission is recorded; pass the time to release() if the alert is never stored.
+        """
+        now = time.time()
+        key = (user_id, camera_id, alert_type, subject)
+        window = self.window(alert_type)
+        with self.lock:
+            if self.loader is not None:
+                self.warm()
+            # Alerts logged before this process started count for every subject
+            last = self.last_emitted.get(key, self.warmed.get(key[:3], 0.0))
+            if now - last < window:
+                self.suppressed += 1
+                return None
+            self.last_emitted[key] = now
+            self.emitted += 1
+            if len(self.last_emitted) > self.max_entries:
+                longest = max([self.window('default')] + list(self.windows.values()))
+                self.last_emitted = {k: t for k, t in self.last_emitted.items() if now - t < longest}
+            return now
+
+    def release(self, user_id, camera_id, alert_type, subject=None, emitted_at=None):
+        """Forget an emission whose alert was dropped, so the next detection is not held back by it"""
+        key = (user_id, camera_id, alert_type, subject)
+        with self.lock:
+            # Leave a newer emission in place
+            if key in self.last_emitted and (emitted_at is None or self.last_emitted[key] == emitted_at):
+                del self.last_emitted[key]
+                self.released += 1
+
+    def stats(self):
+        return {
+            'entries': len(self.last_emitted),
+            'emitted': self.emitted,
+            'suppressed': self.suppressed,
+            'released': self.released
+        }
+
+
+if __name__ == "__main__":
+    # Quick self-check: python cooldown_cache.py
+    cache = cooldown_cache({'default': 30})
+    first = cache.should_emit(1, 'cam', 'fire_detection')
+    assert first is not None, "first alert should be emitted"
+    assert cache.should_emit(1, 'cam', 'fire_detection') is None, "repeat within the window should be suppressed"
+    assert cache.should_emit(1, 'cam', 'fire_detection', subject='track:2') is not None, "other subjects are independent"
+    cache.release(1, 'cam', 'fire_detection', emitted_at=first)
+    assert cache.should_emit(1, 'cam', 'fire_detection') is not None, "a released emission should not block"
+    print(f"✅ cooldown_cache checks passed: {cache.stats()}")
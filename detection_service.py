@@ -0,0 +1,176 @@
+# detection_service.py
+#
+# Headless, always-on detection. Runs a pipeline for every configured camera
+# whether or not anyone has the dashboard open, and publishes the annotated
+# frames so the web process only has to read them. Start the web process with
+# DETECTION_SERVICE=1 so it never falls back to running detection itself.
+#
+#   python detection_service.py
+#   python detection_service.py --mode classical   # OpenCV-only worker, no torch needed
+#   python detection_service.py --workers 4        # capture and detection in separate processes
+
+import argparse
+import os
+import time
+
+from app import app, Camera, analyze_frame, camera_settings, live_frame_path, LIVE_FRAME_DIR, alert_queue
+from camera_pipeline import camera_pipeline
+from worker_pool import worker_pool
+
+DETECTION_FLAGS = [
+    'pose_alert', 'fire_detection', 'smoke_detection', 'safety_gear_detection',
+    'enhanced_gear_detection', 'intrusion_detection', 'leakage_detection',
+    'activity_monitoring', 'defect_detection', 'crowd_detection', 'air_quality_monitoring'
+]
+
+# Detectors built purely on OpenCV; they never load a YOLO model
+CLASSICAL_FLAGS = ['leakage_detection', 'defect_detection', 'air_quality_monitoring']
+
+MODES = {
+    'all': DETECTION_FLAGS,
+    'classical': CLASSICAL_FLAGS,
+    'neural': [flag for flag in DETECTION_FLAGS if flag not in CLASSICAL_FLAGS]
+}
+
+
+class detection_supervisor:
+    """
+    Keeps one detection worker running per enabled camera.
+    Workers that crash or lose their stream are restarted with exponential backoff.
+
+    Args:
+    interval: seconds between health checks and camera table refreshes.
+    max_backoff: longest wait before restarting a failing worker.
+    mode: 'all', 'classical' (OpenCV detectors only) or 'neural' (everything else).
+    processes: detection processes to spread cameras over; 0 runs every camera as a thread.
+    """
+
+    def __init__(self, interval=5.0, max_backoff=60.0, mode='all', processes=0):
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.mode = mode
+        self.flags = MODES[mode]
+        self.workers = {}
+        self.failures = {}
+        self.pool = worker_pool(workers=processes, max_backoff=max_backoff) if processes > 0 else None
+        self.status_interval = 60.0
+        self.last_status = time.time()
+
+    def load_cameras(self):
+        """Read every Camera row that has at least one detection of this mode enabled"""
+        with app.app_context():
+            cameras = Camera.query.all()
+            settings = [camera_settings(camera) for camera in cameras]
+
+        for s in settings:
+            for flag in DETECTION_FLAGS:
+                if flag not in self.flags:
+                    s[flag] = False
+        return {
+            (s['user_id'], s['cam_id']): s
+            for s in settings if any(s.get(flag) for flag in self.flags)
+        }
+
+    def publish_path(self, key):
+        # A classical-only worker publishes to its own file; the viewer uses it when no neural worker publishes
+        return live_frame_path(*key, mode='classical') if self.mode == 'classical' else live_frame_path(*key)
+
+    def start_worker(self, key, settings):
+        user_id, camid = key
+        worker = camera_pipeline(camid, analyze_frame, settings, keep_alive=True,
+                                 publish_path=self.publish_path(key))
+        worker.start()
+        self.workers[key] = worker
+        print(f"▶️ Started detection worker for camera {camid} (user {user_id})")
+
+    def stop_worker(self, key):
+        worker = self.workers.pop(key, None)
+        self.failures.pop(key, None)
+        if worker is not None:
+            worker.stop()
+            print(f"⏹️ Stopped detection worker for camera {key[1]} (user {key[0]})")
+
+    def restart_worker(self, key, settings):
+        """Restart a dead worker once its backoff period has passed"""
+        worker = self.workers[key]
+        count, retry_at = self.failures.get(key, (0, None))
+        now = time.time()
+
+        if retry_at is None:
+            # A worker that produced frames before dying starts a fresh backoff sequence
+            count = 1 if worker.frame_id > 0 else count + 1
+            retry_at = now + min(self.max_backoff, 2 ** count)
+            self.failures[key] = (count, retry_at)
+            print(f"⚠️ Detection worker for camera {key[1]} stopped: {worker.error or 'stream ended'}. "
+                  f"Restarting in {retry_at - now:.0f}s")
+            return
+
+        if now >= retry_at:
+            self.failures[key] = (count, None)
+            self.start_worker(key, settings)
+
+    def sync(self):
+        """Start, stop, restart and reconfigure workers to match the camera table"""
+        wanted = self.load_cameras()
+
+        if self.pool is not None:
+            self.pool.sync(wanted, self.publish_path)
+            return
+
+        for key in list(self.workers):
+            if key not in wanted:
+                self.stop_worker(key)
+
+        for key, settings in wanted.items():
+            worker = self.workers.get(key)
+            if worker is None:
+                self.start_worker(key, settings)
+            elif not worker.running:
+                self.restart_worker(key, settings)
+            else:
+                worker.update_settings(settings)
+
+    def run(self):
+        os.makedirs(LIVE_FRAME_DIR, exist_ok=True)
+        print(f"🛰️ Detection service running ({self.mode} detectors). Press Ctrl+C to stop.")
+        try:
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"❌ Error refreshing detection workers: {e}")
+                if time.time() - self.last_status > self.status_interval:
+                    self.last_status = time.time()
+                    if self.pool is not None:
+                        for (user_id, camid), stats in self.pool.stats().items():
+                            print(f"📈 Camera {camid} (user {user_id}): {stats['frames_analysed']} frames analysed, "
+                                  f"latest detections {stats['detections']}")
+                    else:
+                        # Worker processes each run their own alert writer; in thread mode it is this one
+                        queue_stats = alert_queue.stats()
+                        print(f"🗄️ Alert writer: {queue_stats['queue_depth']} queued, {queue_stats['written']} written, "
+                              f"{queue_stats['dropped']} dropped")
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping detection service...")
+        finally:
+            for key in list(self.workers):
+                self.stop_worker(key)
+            if self.pool is not None:
+                self.pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Always-on detection service for IndustrialAI")
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help="seconds between worker health checks")
+    parser.add_argument('--max-backoff', type=float, default=60.0,
+                        help="longest wait before restarting a failing worker")
+    parser.add_argument('--mode', choices=sorted(MODES), default='all',
+                        help="which detectors to run: classical needs only OpenCV, no torch")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="detection processes fed through shared memory (0 = threads in this process)")
+    args = parser.parse_args()
+
+    detection_supervisor(interval=args.interval, max_backoff=args.max_backoff, mode=args.mode,
+                         processes=args.workers).run()
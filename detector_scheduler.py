@@ -0,0 +1,133 @@
+import json
+import time
+
+# Default cadence per detector. A cadence may combine:
+#   every:     run on every Nth analysed frame
+#   interval:  run at most once per this many seconds
+#   on_motion: only run when the motion gate reports a change (fire and smoke opt out)
+#   priority:  critical detectors are never throttled; low ones are throttled first
+DEFAULT_CADENCES = {
+    'fire_detection': {'every': 1, 'priority': 'critical'},
+    'smoke_detection': {'every': 1, 'priority': 'critical'},
+    'intrusion_detection': {'every': 1, 'on_motion': True, 'priority': 'critical'},
+    'pose_alert': {'every': 1, 'priority': 'critical'},
+    'enhanced_gear_detection': {'every': 2, 'priority': 'high'},
+    'safety_gear_detection': {'every': 2, 'priority': 'high'},
+    'leakage_detection': {'every': 3, 'priority': 'high'},
+    'crowd_detection': {'every': 5, 'on_motion': True, 'priority': 'medium'},
+    'activity_monitoring': {'every': 5, 'on_motion': True, 'priority': 'low'},
+    'air_quality_monitoring': {'interval': 1.0, 'priority': 'low'},
+    'defect_detection': {'on_motion': True, 'priority': 'low'}
+}
+
+# Overload level at which each priority starts being throttled
+THROTTLE_LEVELS = {'low': 1, 'medium': 2, 'high': 3}
+THROTTLE_FACTOR = 4
+MAX_OVERLOAD_LEVEL = 3
+# Priorities a cadence override may name
+CADENCE_PRIORITIES = set(THROTTLE_LEVELS) | {'critical'}
+
+
+def is_positive_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def parse_cadences(text):
+    """Per-camera cadence overrides stored as JSON; raises ValueError when malformed"""
+    if not text:
+        return {}
+    cadences = json.loads(text)
+    if not isinstance(cadences, dict):
+        raise ValueError("Cadences must map detector names to objects")
+    for name, cadence in cadences.items():
+        if name not in DEFAULT_CADENCES:
+            raise ValueError(f"Unknown detector '{name}'")
+        if not isinstance(cadence, dict):
+            raise ValueError(f"Cadence for {name} must be an object")
+        for key, value in cadence.items():
+            if key in ('every', 'interval'):
+                if not is_positive_number(value):
+                    raise ValueError(f"{name}.{key} must be a positive number")
+            elif key == 'on_motion':
+                if not isinstance(value, bool):
+                    raise ValueError(f"{name}.on_motion must be true or false")
+            elif key == 'priority':
+                if value not in CADENCE_PRIORITIES:
+                    raise ValueError(f"{name}.priority must be one of {', '.join(sorted(CADENCE_PRIORITIES))}")
+            else:
+                raise ValueError(f"Unknown cadence setting '{key}' for {name}")
+    return cadences
+
+
+def load_cadences(text):
+    """Stored cadence overrides, or none when they no longer validate, so a bad row cannot stop a camera"""
+    try:
+        return parse_cadences(text)
+    except ValueError as e:
+        print(f"⚠️ Ignoring invalid detector cadence: {e}")
+        return {}
+
+
+class detector_scheduler:
+    """
+    Decides which detectors run on each analysed frame of one camera.
+    While the camera is overloaded, the overload level rises frame by frame
+    and throttles low, then medium, then high priority detectors.
+
+    Args:
+    cadences: per-detector overrides merged over DEFAULT_CADENCES.
+    """
+
+    def __init__(self, cadences=None):
+        self.configure(cadences)
+        self.frame_index = 0
+        self.overload_level = 0
+        self.motion = None
+        self.last_frame = {}
+        self.last_time = {}
+        self.runs = {}
+        self.skips = {}
+
+    def configure(self, cadences=None):
+        self.cadences_source = cadences
+        self.cadences = {name: dict(cadence) for name, cadence in DEFAULT_CADENCES.items()}
+        for name, cadence in (cadences or {}).items():
+            self.cadences.setdefault(name, {}).update(cadence)
+
+    def next_frame(self, overloaded=False, motion=None):
+        """Start a new analysed frame; motion is None when no motion gate is running"""
+        self.frame_index += 1
+        self.motion = motion
+        if overloaded:
+            self.overload_level = min(MAX_OVERLOAD_LEVEL, self.overload_level + 1)
+        else:
+            self.overload_level = max(0, self.overload_level - 1)
+
+    def should_run(self, detector):
+        cadence = self.cadences.get(detector, {})
+        threshold = THROTTLE_LEVELS.get(cadence.get('priority'))
+        factor = THROTTLE_FACTOR if threshold is not None and self.overload_level >= threshold else 1
+        now = time.time()
+
+        due = True
+        if cadence.get('on_motion') and self.motion is False:
+            due = False
+        if self.frame_index - self.last_frame.get(detector, -10 ** 9) < cadence.get('every', 1) * factor:
+            due = False
+        if now - self.last_time.get(detector, 0.0) < cadence.get('interval', 0.0) * factor:
+            due = False
+
+        if due:
+            self.last_frame[detector] = self.frame_index
+            self.last_time[detector] = now
+            self.runs[detector] = self.runs.get(detector, 0) + 1
+        else:
+            self.skips[detector] = self.skips.get(detector, 0) + 1
+        return due
+
+    def stats(self):
+        return {
+            'overload_level': self.overload_level,
+            'runs': dict(self.runs),
+            'skips': dict(self.skips)
+        }
@@ -1,5 +1,80 @@
 import sqlite3
 import os
+import random
+import time
+from datetime import datetime, timedelta
+
+# Applied to every connection, here and by the app (see app.py)
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL;",      # readers no longer wait for the alert writer
+    "PRAGMA synchronous=NORMAL;",    # safe with WAL, one fsync per checkpoint instead of per commit
+    "PRAGMA cache_size=-20000;",     # 20 MB page cache
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA busy_timeout=5000;"
+]
+
+# Composite indexes for the alert queries: dashboard and notifications filter by user and time,
+# critical counts add severity, analytics group by type, cooldowns look up user, camera and type
+ALERT_INDEXES = {
+    'ix_alert_user_time': 'alert (user_id, date_time)',
+    'ix_alert_user_severity_time': 'alert (user_id, severity, date_time)',
+    'ix_alert_user_type_time': 'alert (user_id, alert_type, date_time)',
+    'ix_alert_user_camera_type_time': 'alert (user_id, camera_id, alert_type, date_time)',
+    'ix_alert_snapshot_key': 'alert (snapshot_key)'
+}
+
+ALERT_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS alert (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        date_time DATETIME,
+        alert_type VARCHAR(50),
+        severity VARCHAR(20) DEFAULT 'medium',
+        frame_snapshot BLOB,
+        description TEXT,
+        camera_id VARCHAR(100),
+        confidence FLOAT DEFAULT 0.0,
+        snapshot_key VARCHAR(64),
+        snapshot_width INTEGER,
+        snapshot_height INTEGER,
+        snapshot_bytes INTEGER,
+        FOREIGN KEY (user_id) REFERENCES user (id)
+    )
+'''
+
+# Alert rollups: start of the bucket holding an alert, per granularity, as an strftime format
+# understood by both Python and SQLite. 'all' is one bucket covering the whole history.
+ROLLUP_BUCKETS = {
+    'minute': '%Y-%m-%d %H:%M:00',
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+    'all': '1970-01-01 00:00:00'
+}
+
+ROLLUP_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS alert_rollup (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        granularity VARCHAR(10) NOT NULL,
+        bucket VARCHAR(19) NOT NULL,
+        user_id INTEGER NOT NULL,
+        camera_id VARCHAR(100) NOT NULL DEFAULT '',
+        alert_type VARCHAR(50) NOT NULL,
+        severity VARCHAR(20) NOT NULL,
+        alert_count INTEGER NOT NULL DEFAULT 0,
+        CONSTRAINT uq_alert_rollup UNIQUE (granularity, user_id, bucket, camera_id, alert_type, severity)
+    )
+'''
+
+def apply_pragmas(conn):
+    cursor = conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def create_indexes(cursor):
+    for name, columns in ALERT_INDEXES.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns};")
+        print(f"✅ Index ready: {name}")
 
 def migrate_database():
     """
@@ -16,6 +91,7 @@ def migrate_database():
     
     # Connect to the main database (user.db contains all tables)
     conn = sqlite3.connect('instance/user.db')
+    apply_pragmas(conn)
     cursor = conn.cursor()
     
     try:
@@ -38,7 +114,14 @@ def migrate_database():
                 'activity_monitoring': 'BOOLEAN DEFAULT 0',
                 'defect_detection': 'BOOLEAN DEFAULT 0',
                 'crowd_detection': 'BOOLEAN DEFAULT 0',
-                'air_quality_monitoring': 'BOOLEAN DEFAULT 0'
+                'air_quality_monitoring': 'BOOLEAN DEFAULT 0',
+                'min_analysis_fps': 'FLOAT DEFAULT 1.0',
+                'detector_cadence': 'TEXT',
+                'inference_resolution': 'VARCHAR(20)',
+                'display_resolution': 'VARCHAR(20)',
+                'snapshot_resolution': 'VARCHAR(20)',
+                'zones': 'TEXT',
+                'roi': 'VARCHAR(100)'
             }
             
             for column_name, column_def in new_columns.items():
@@ -57,7 +140,11 @@ def migrate_database():
                 'severity': 'VARCHAR(20) DEFAULT "medium"',
                 'description': 'TEXT',
                 'camera_id': 'VARCHAR(100)',
-                'confidence': 'FLOAT DEFAULT 0.0'
+                'confidence': 'FLOAT DEFAULT 0.0',
+                'snapshot_key': 'VARCHAR(64)',
+                'snapshot_width': 'INTEGER',
+                'snapshot_height': 'INTEGER',
+                'snapshot_bytes': 'INTEGER'
             }
             
             for column_name, column_def in alert_new_columns.items():
@@ -67,6 +154,13 @@ def migrate_database():
                         print(f"✅ Added alert column: {column_name}")
                     except sqlite3.OperationalError as e:
                         print(f"⚠️ Alert column {column_name} might already exist: {e}")
+
+            create_indexes(cursor)
+            
+            # The app's create_all() may already have made an empty rollup table, so check its counts
+            cursor.execute(ROLLUP_TABLE_SQL)
+            if not rollups_current(cursor):
+                rebuild_rollups(cursor)
         else:
             print("❌ Camera table does not exist. Creating new tables...")
             # If table doesn't exist, create it with all columns
@@ -80,10 +174,88 @@ def migrate_database():
         conn.rollback()
     finally:
         conn.close()
+    
+    move_snapshots_to_store()
+
+def rollups_current(cursor):
+    """True when the all-time rollups count every alert, i.e. the history has been backfilled"""
+    cursor.execute('''
+        SELECT COUNT(*) FROM alert
+        WHERE user_id IS NOT NULL AND date_time IS NOT NULL AND alert_type IS NOT NULL
+    ''')
+    alerts = cursor.fetchone()[0]
+    cursor.execute("SELECT COALESCE(SUM(alert_count), 0) FROM alert_rollup WHERE granularity = 'all';")
+    return cursor.fetchone()[0] == alerts
+
+def rebuild_rollups(cursor):
+    """Recount every alert rollup from the alert table"""
+    cursor.execute("DELETE FROM alert_rollup;")
+    for granularity, bucket_format in ROLLUP_BUCKETS.items():
+        cursor.execute('''
+            INSERT INTO alert_rollup (granularity, bucket, user_id, camera_id, alert_type, severity, alert_count)
+            SELECT ?, strftime(?, date_time), user_id, COALESCE(camera_id, ''), alert_type,
+                   COALESCE(severity, 'medium'), COUNT(*)
+            FROM alert
+            WHERE user_id IS NOT NULL AND date_time IS NOT NULL AND alert_type IS NOT NULL
+            GROUP BY strftime(?, date_time), user_id, COALESCE(camera_id, ''), alert_type, COALESCE(severity, 'medium')
+        ''', (granularity, bucket_format, bucket_format))
+    print("✅ Alert rollups rebuilt from alert history")
+
+def move_snapshots_to_store(root='instance/snapshots', batch_size=200):
+    """
+    Move JPEG snapshots still stored in alert rows into the snapshot store,
+    keeping only the key and size in the row, then reclaim the space
+    """
+    import cv2
+    import numpy as np
+    from snapshot_store import snapshot_store
+    
+    store = snapshot_store(root)
+    conn = sqlite3.connect('instance/user.db')
+    apply_pragmas(conn)
+    cursor = conn.cursor()
+    moved = 0
+    
+    try:
+        cursor.execute("SELECT COUNT(*) FROM alert WHERE frame_snapshot IS NOT NULL;")
+        remaining = cursor.fetchone()[0]
+        if not remaining:
+            print("✅ No snapshots left to move")
+            return
+        print(f"📦 Moving {remaining} snapshots to {root}...")
+        
+        last_id = 0
+        while True:
+            cursor.execute("SELECT id, frame_snapshot FROM alert WHERE frame_snapshot IS NOT NULL AND id > ? "
+                           "ORDER BY id LIMIT ?;", (last_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            for alert_id, jpeg in rows:
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                width, height = (frame.shape[1], frame.shape[0]) if frame is not None else (None, None)
+                key = store.put(jpeg, frame)
+                cursor.execute("UPDATE alert SET snapshot_key = ?, snapshot_width = ?, snapshot_height = ?, "
+                               "snapshot_bytes = ?, frame_snapshot = NULL WHERE id = ?;",
+                               (key, width, height, len(jpeg), alert_id))
+                last_id = alert_id
+            conn.commit()
+            moved += len(rows)
+            print(f"   {moved}/{remaining} moved")
+        
+        # Hand the freed pages back to the filesystem
+        cursor.execute("VACUUM;")
+        print(f"✅ Moved {moved} snapshots out of the database")
+    except Exception as e:
+        print(f"❌ Error moving snapshots: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
 
 def create_tables():
     """Create all tables with complete schema"""
     conn = sqlite3.connect('instance/user.db')
+    apply_pragmas(conn)
     cursor = conn.cursor()
     
     try:
@@ -116,25 +288,21 @@ def create_tables():
                 crowd_detection BOOLEAN DEFAULT 0,
                 air_quality_monitoring BOOLEAN DEFAULT 0,
                 region BOOLEAN DEFAULT 0,
+                min_analysis_fps FLOAT DEFAULT 1.0,
+                detector_cadence TEXT,
+                inference_resolution VARCHAR(20),
+                display_resolution VARCHAR(20),
+                snapshot_resolution VARCHAR(20),
+                zones TEXT,
+                roi VARCHAR(100),
                 FOREIGN KEY (user_id) REFERENCES user (id)
             )
         ''')
         
         # Create Alert table with all columns
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS alert (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                date_time DATETIME,
-                alert_type VARCHAR(50),
-                severity VARCHAR(20) DEFAULT 'medium',
-                frame_snapshot BLOB,
-                description TEXT,
-                camera_id VARCHAR(100),
-                confidence FLOAT DEFAULT 0.0,
-                FOREIGN KEY (user_id) REFERENCES user (id)
-            )
-        ''')
+        cursor.execute(ALERT_TABLE_SQL)
+        create_indexes(cursor)
+        cursor.execute(ROLLUP_TABLE_SQL)
         
         # Create SystemMetrics table
         cursor.execute('''
@@ -206,6 +374,91 @@ def check_database_status():
     finally:
         conn.close()
 
+def benchmark_alert_queries(rows=1000000, path='instance/benchmark.db'):
+    """
+    Time the dashboard, notification, analytics and cooldown queries on a synthetic
+    alert table, first without and then with the composite indexes
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    
+    conn = sqlite3.connect(path)
+    apply_pragmas(conn)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute(ALERT_TABLE_SQL)
+        
+        print(f"📝 Inserting {rows:,} synthetic alerts (20 users, 10 cameras each, 180 days)...")
+        random.seed(0)
+        alert_types = ['fire_detection', 'smoke_detection', 'gear_violation', 'ppe_violation', 'intrusion_alert',
+                       'leakage_alert', 'activity_alert', 'defect_alert', 'crowd_alert', 'air_quality_alert']
+        severities = ['low', 'medium', 'high', 'critical']
+        now = datetime.now()
+        chunk = 100000
+        for start in range(0, rows, chunk):
+            cursor.executemany(
+                "INSERT INTO alert (user_id, date_time, alert_type, severity, description, camera_id, confidence) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(random.randint(1, 20),
+                  str(now - timedelta(seconds=random.randint(0, 180 * 86400))),
+                  random.choice(alert_types),
+                  random.choice(severities),
+                  'benchmark alert',
+                  str(random.randint(0, 9)),
+                  round(random.random(), 2))
+                 for _ in range(min(chunk, rows - start))])
+            conn.commit()
+        
+        day_ago = str(now - timedelta(hours=24))
+        week_ago = str(now - timedelta(days=7))
+        queries = [
+            ('Alerts in last 24 h', "SELECT COUNT(*) FROM alert WHERE user_id = ? AND date_time >= ?", (1, day_ago)),
+            ('Critical alerts in last 24 h', "SELECT COUNT(*) FROM alert WHERE user_id = ? AND severity = 'critical' "
+                                             "AND date_time >= ?", (1, day_ago)),
+            ('Notifications page', "SELECT id, date_time, alert_type, severity, description, camera_id FROM alert "
+                                   "WHERE user_id = ? ORDER BY date_time DESC LIMIT 100", (1,)),
+            ('Alerts by type', "SELECT alert_type, COUNT(id) FROM alert WHERE user_id = ? GROUP BY alert_type", (1,)),
+            ('Alerts by severity', "SELECT severity, COUNT(id) FROM alert WHERE user_id = ? GROUP BY severity", (1,)),
+            ('Daily alerts, 7 days', "SELECT date(date_time), COUNT(id) FROM alert WHERE user_id = ? AND date_time >= ? "
+                                     "GROUP BY date(date_time)", (1, week_ago)),
+            ('Latest alert per stream', "SELECT MAX(date_time) FROM alert WHERE user_id = ? AND camera_id = ? "
+                                        "AND alert_type = ?", (1, '3', 'fire_detection'))
+        ]
+        
+        def time_queries():
+            timings = []
+            for _, sql, params in queries:
+                best = None
+                for _ in range(3):
+                    started = time.perf_counter()
+                    cursor.execute(sql, params).fetchall()
+                    elapsed = (time.perf_counter() - started) * 1000
+                    best = elapsed if best is None else min(best, elapsed)
+                timings.append(best)
+            return timings
+        
+        print("⏱️ Timing queries without indexes...")
+        before = time_queries()
+        create_indexes(cursor)
+        cursor.execute("ANALYZE;")
+        conn.commit()
+        print("⏱️ Timing queries with indexes...")
+        after = time_queries()
+        
+        print(f"\n{'Query':<32}{'No index (ms)':>16}{'Indexed (ms)':>16}")
+        for (name, _, _), without, indexed in zip(queries, before, after):
+            print(f"{name:<32}{without:>16.2f}{indexed:>16.2f}")
+            
+    except Exception as e:
+        print(f"❌ Benchmark error: {e}")
+    finally:
+        conn.close()
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
 if __name__ == "__main__":
     print("🔧 Database Migration Tool for IndustrialAI")
     print("=" * 50)
@@ -213,8 +466,10 @@ if __name__ == "__main__":
     print("2. Reset database (WARNING: Deletes all data)")
     print("3. Check database status")
     print("4. Create fresh database")
+    print("5. Benchmark alert queries at 1M rows")
+    print("6. Rebuild alert rollups")
     
-    choice = input("\nEnter your choice (1-4): ").strip()
+    choice = input("\nEnter your choice (1-6): ").strip()
     
     if choice == "1":
         print("\n🔄 Starting database migration...")
@@ -232,5 +487,22 @@ if __name__ == "__main__":
         print("\n🆕 Creating fresh database...")
         reset_database()
         create_tables()
+    elif choice == "5":
+        print("\n⏱️ Benchmarking alert queries...")
+        benchmark_alert_queries()
+    elif choice == "6":
+        print("\n🔄 Rebuilding alert rollups...")
+        conn = sqlite3.connect('instance/user.db')
+        apply_pragmas(conn)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(ROLLUP_TABLE_SQL)
+            rebuild_rollups(cursor)
+            conn.commit()
+        except Exception as e:
+            print(f"❌ Error rebuilding rollups: {e}")
+            conn.rollback()
+        finally:
+            conn.close()
     else:
         print("❌ Invalid choice.")
\ No newline at end of file
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.person_tracker import detect_people
 
 class activity_monitoring:
     """
@@ -9,7 +10,7 @@ class activity_monitoring:
     """
     
     def __init__(self, model_path="yolov8n.pt", conf=0.70):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
         self.activity_classes = {
             'operating_machine': 'Operating Equipment',
@@ -53,7 +54,7 @@ class activity_monitoring:
             else:
                 return 'maintenance'
     
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for activity monitoring
         Returns: (activities_detected, person_boxes, activities_list)
@@ -63,25 +64,23 @@ class activity_monitoring:
         
         person_boxes = []
         activities = []
-        results = self.model(img, verbose=False)
-        
-        # Detect persons (class 0 in COCO dataset)
-        for box in results[0].boxes:
-            if int(box.cls[0]) == 0 and float(box.conf[0]) > self.confidence:  # Person class
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                person_boxes.append([x1, y1, x2, y2])
-                
-                # Classify activity
-                activity = self.classify_activity([x1, y1, x2, y2], img)
-                activities.append(activity)
-                
-                # Draw bounding box and activity label
-                color = self.get_activity_color(activity)
-                cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
-                
-                activity_name = self.activity_classes.get(activity, activity.title())
-                cv2.putText(img, activity_name, (x1, y1-10), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
+
+        for (x1, y1, x2, y2), track in detect_people(self.model, img, context, self.confidence):
+            person_boxes.append([x1, y1, x2, y2])
+            
+            # Classify activity
+            activity = self.classify_activity([x1, y1, x2, y2], img)
+            activities.append(activity)
+            
+            # Draw bounding box and activity label
+            color = self.get_activity_color(activity)
+            cv2.rectangle(img, (x1, y1), (x2, y2), color, 2)
+            
+            activity_name = self.activity_classes.get(activity, activity.title())
+            if track is not None:
+                activity_name = f"#{track['id']} {activity_name}"
+            cv2.putText(img, activity_name, (x1, y1-10), 
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
         
         activities_detected = len(activities) > 0
         return (activities_detected, person_boxes, activities)
@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
 import random
+from models.frame_context import frame_context
 
 class air_quality_detection:
     """
@@ -19,9 +20,9 @@ class air_quality_detection:
             'hazardous': (301, 500)
         }
         
-    def analyze_visibility(self, frame):
+    def analyze_visibility(self, context):
         """Analyze frame visibility to detect air quality issues"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        gray = context.gray
         
         # Calculate image contrast and brightness
         contrast = np.std(gray)
@@ -32,12 +33,10 @@ class air_quality_detection:
         
         return visibility_score
     
-    def detect_particles(self, frame):
+    def detect_particles(self, context):
         """Detect airborne particles using image processing"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Apply Gaussian blur
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        gray = context.gray
+        blurred = context.blurred(5)
         
         # Detect particles using background subtraction simulation
         # In real implementation, this would use background subtraction
@@ -89,17 +88,19 @@ class air_quality_detection:
                 return level
         return 'hazardous'
     
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for air quality monitoring
         Returns: (air_quality_alert, sensor_data, quality_level)
         """
         if not flag:
             return (False, {}, 'good')
+        if context is None:
+            context = frame_context(img)
         
         # Analyze visual indicators
-        visibility = self.analyze_visibility(img)
-        particle_count = self.detect_particles(img)
+        visibility = self.analyze_visibility(context)
+        particle_count = self.detect_particles(context)
         
         # Get simulated sensor data
         sensor_data = self.simulate_sensor_data()
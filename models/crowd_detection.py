@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.person_tracker import detect_people
 
 class crowd_detection:
     """
@@ -9,7 +10,7 @@ class crowd_detection:
     """
     
     def __init__(self, model_path="yolov8n.pt", conf=0.60):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
         self.density_thresholds = {
             'low': 5,
@@ -68,7 +69,7 @@ class crowd_detection:
         
         return bottlenecks
     
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for crowd detection
         Returns: (crowd_alert, person_boxes, density_info)
@@ -77,16 +78,12 @@ class crowd_detection:
             return (False, [], 'low')
         
         person_boxes = []
-        results = self.model(img, verbose=False)
-        
-        # Detect persons (class 0 in COCO dataset)
-        for box in results[0].boxes:
-            if int(box.cls[0]) == 0 and float(box.conf[0]) > self.confidence:  # Person class
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                person_boxes.append([x1, y1, x2, y2])
-                
-                # Draw person bounding box
-                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 1)
+
+        for (x1, y1, x2, y2), _ in detect_people(self.model, img, context, self.confidence):
+            person_boxes.append([x1, y1, x2, y2])
+            
+            # Draw person bounding box
+            cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 1)
         
         # Calculate crowd density
         frame_area = img.shape[0] * img.shape[1]
@@ -1,15 +1,14 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from models.frame_context import frame_context
 
 class defect_detection:
     """
     Product defect detection for assembly lines and manufacturing.
-    Identifies defective products using image analysis and ML.
+    Identifies defective products using edge, contour and color analysis.
     """
     
-    def __init__(self, model_path="yolov8n.pt", conf=0.80):
-        self.model = YOLO(model_path)
+    def __init__(self, conf=0.80):
         self.confidence = conf
         self.defect_types = {
             'scratch': 'Surface Scratch',
@@ -20,15 +19,10 @@ class defect_detection:
             'size_error': 'Size Deviation'
         }
         
-    def detect_surface_defects(self, frame):
+    def detect_surface_defects(self, context):
         """Detect surface defects using edge detection and contour analysis"""
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # Edge detection
-        edges = cv2.Canny(blurred, 50, 150)
+        # Edge detection on the gray frame, blurred to reduce noise
+        edges = context.edges(50, 150, blur=5)
         
         # Morphological operations to connect broken edges
         kernel = np.ones((3, 3), np.uint8)
@@ -60,9 +54,9 @@ class defect_detection:
         
         return defects
     
-    def detect_color_defects(self, frame):
+    def detect_color_defects(self, context):
         """Detect color-based defects"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        hsv = context.hsv
         
         # Define expected color range (this should be calibrated for specific products)
         lower_expected = np.array([0, 50, 50])
@@ -90,23 +84,25 @@ class defect_detection:
         
         return defects
     
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for defect detection
         Returns: (defects_found, bounding_boxes, defect_details)
         """
         if not flag:
             return (False, [], [])
+        if context is None:
+            context = frame_context(img)
         
         all_defects = []
         bounding_boxes = []
         
         # Detect surface defects
-        surface_defects = self.detect_surface_defects(img)
+        surface_defects = self.detect_surface_defects(context)
         all_defects.extend(surface_defects)
         
         # Detect color defects
-        color_defects = self.detect_color_defects(img)
+        color_defects = self.detect_color_defects(context)
         all_defects.extend(color_defects)
         
         # Draw defects on image
@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.result_arrays import result_arrays
 import cv2
 
 class enhanced_gear_detection:
@@ -8,7 +9,7 @@ class enhanced_gear_detection:
     """
     
     def __init__(self, model_path, conf=0.75):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
         self.gear_classes = {
             0: "person",
@@ -63,7 +64,7 @@ class enhanced_gear_detection:
         
         return compliance_results
 
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for enhanced safety gear detection
         Returns: (violations_found, bounding_boxes, compliance_data)
@@ -71,22 +72,15 @@ class enhanced_gear_detection:
         if not flag:
             return (False, [], [])
 
-        detections = []
-        bb_boxes = []
-        result = self.model(img, verbose=False)
+        result = context.arrays(self.model) if context else result_arrays.from_results(self.model(img, verbose=False))
+        result = result.filter(min_conf=self.confidence)
+        bb_boxes = result.boxes()
 
         # Extract all detections
-        for box in result[0].boxes:
-            if float(box.conf[0]) > self.confidence:
-                bbox = list(map(int, box.xyxy[0]))
-                class_id = int(box.cls[0])
-                
-                detections.append({
-                    'bbox': bbox,
-                    'class': class_id,
-                    'confidence': float(box.conf[0])
-                })
-                bb_boxes.append(bbox)
+        detections = [
+            {'bbox': bbox, 'class': class_id, 'confidence': confidence}
+            for bbox, class_id, confidence in zip(bb_boxes, result.cls.tolist(), result.conf.tolist())
+        ]
 
         # Check compliance for each person
         compliance_results = self.check_compliance(detections)
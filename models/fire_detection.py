@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.result_arrays import result_arrays
 import cv2
 from playsound import playsound
 import threading
@@ -6,24 +7,19 @@ import threading
 class fire_detection():
     
     def __init__(self, model_path, conf=0.85, sound_path="./static/audio/fire_alarm.mp3"):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
         self.sound_path = sound_path
 
     def play_alert_sound(self):
         threading.Thread(target=playsound, args=(self.sound_path,), daemon=True).start()
 
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         if not flag:
             return (False, [])
 
-        bb_boxes = []
-        result = self.model(img, verbose=False)
-
-        for box in result[0].boxes:
-            if float(box.conf[0]) > self.confidence:
-                bb = list(map(int, box.xyxy[0]))
-                bb_boxes.append(bb)
+        result = context.arrays(self.model) if context else result_arrays.from_results(self.model(img, verbose=False))
+        bb_boxes = result.filter(min_conf=self.confidence).boxes()
 
         if len(bb_boxes):
             found = True
@@ -0,0 +1,66 @@
+import cv2
+from models.result_arrays import result_arrays
+
+
+class frame_context:
+    """
+    Per-frame cache shared by every detector that analyses the same frame.
+    Each model runs at most once per frame, always on the clean frame so
+    overlays drawn by earlier detectors never reach later ones. The gray, HSV,
+    blurred and edge images used by the classical detectors are built lazily,
+    once per frame, the same way.
+
+    Args:
+    frame: unannotated frame the detectors are analysing.
+    scheduler: optional inference_scheduler that batches this frame with other cameras.
+    """
+
+    def __init__(self, frame, scheduler=None):
+        self.frame = frame
+        self.scheduler = scheduler
+        self.results = {}
+        self.inference_count = 0
+        self.images = {}
+        self.arrays_cache = {}
+        # Person tracks for this frame, set when the camera runs a person_tracker
+        self.tracks = None
+
+    def predict(self, model, **kwargs):
+        """Run model on the frame once and hand every caller the same results"""
+        key = (model, tuple(sorted(kwargs.items())))
+        if key not in self.results:
+            if self.scheduler is not None:
+                self.results[key] = self.scheduler.predict(model, self.frame, verbose=False, **kwargs)
+            else:
+                self.results[key] = model(self.frame, verbose=False, **kwargs)
+            self.inference_count += 1
+        return self.results[key]
+
+    def arrays(self, model, **kwargs):
+        """predict() converted once to a result_arrays"""
+        key = (model, tuple(sorted(kwargs.items())))
+        if key not in self.arrays_cache:
+            self.arrays_cache[key] = result_arrays.from_results(self.predict(model, **kwargs))
+        return self.arrays_cache[key]
+
+    def cached(self, key, compute):
+        if key not in self.images:
+            self.images[key] = compute()
+        return self.images[key]
+
+    @property
+    def gray(self):
+        return self.cached('gray', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY))
+
+    @property
+    def hsv(self):
+        return self.cached('hsv', lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV))
+
+    def blurred(self, ksize=5):
+        """Gaussian-blurred gray frame"""
+        return self.cached(('blurred', ksize), lambda: cv2.GaussianBlur(self.gray, (ksize, ksize), 0))
+
+    def edges(self, low=50, high=150, blur=None):
+        """Canny edges of the gray frame, or of blurred(blur) when blur is given"""
+        source = self.gray if blur is None else self.blurred(blur)
+        return self.cached(('edges', low, high, blur), lambda: cv2.Canny(source, low, high))
@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.result_arrays import result_arrays
 import cv2
 
 class gear_detection():
@@ -11,10 +12,10 @@ class gear_detection():
     
     """
     def __init__(self,model_path,conf=0.85):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
 
-    def process(self,img,flag=True):
+    def process(self,img,flag=True,context=None):
         """
         this function processes the cv2 frame and returns the
         bounding boxes
@@ -22,13 +23,8 @@ class gear_detection():
         if not flag:
             return (False,[])
 
-        bb_boxes=[]
-        result=self.model(img,verbose=False)
-
-        for box in result[0].boxes:
-            if((int(box.cls[0])in [2,3,4]) and (float(box.conf[0])>self.confidence)):
-                bb=list(map(int,box.xyxy[0]))
-                bb_boxes.append(bb)
+        result=context.arrays(self.model) if context else result_arrays.from_results(self.model(img,verbose=False))
+        bb_boxes=result.filter(classes=[2,3,4],min_conf=self.confidence).boxes()
 
         if(len(bb_boxes)):
             found=True
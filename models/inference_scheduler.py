@@ -0,0 +1,85 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class inference_scheduler:
+    """
+    Batches inference requests from every camera pipeline.
+    Frames submitted for the same shared model are collected for at most
+    max_wait seconds and run as one batch; each caller gets back its own result.
+
+    Args:
+    max_wait: longest time a frame waits for others to join its batch.
+    max_batch: largest number of frames per model call.
+    """
+
+    def __init__(self, max_wait=0.02, max_batch=16):
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.condition = threading.Condition()
+        self.pending = {}
+        self.workers = {}
+        self.expected = {}
+        self.batches = 0
+        self.frames = 0
+
+    def predict(self, model, frame, **kwargs):
+        """Queue a frame for model and block until its batch has run"""
+        key = (model, tuple(sorted(kwargs.items())))
+        future = Future()
+        with self.condition:
+            self.pending.setdefault(key, []).append((frame, future))
+            if key not in self.workers:
+                worker = threading.Thread(target=self.run, args=(key,), daemon=True)
+                self.workers[key] = worker
+                worker.start()
+            self.condition.notify_all()
+        return future.result()
+
+    def next_batch(self, key):
+        """Wait for the first frame, then give other cameras up to max_wait to join"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.pending.get(key))
+            # Cameras that joined the last batch are likely to submit again, so stop
+            # waiting as soon as that many frames are queued
+            target = min(self.max_batch, self.expected.get(key, 1))
+            deadline = time.time() + self.max_wait
+            while len(self.pending[key]) < target:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            batch = self.pending[key][:self.max_batch]
+            self.pending[key] = self.pending[key][self.max_batch:]
+            return batch
+
+    def run(self, key):
+        model, options = key
+        while True:
+            batch = self.next_batch(key)
+            frames = [frame for frame, _ in batch]
+            try:
+                results = model(frames, **dict(options))
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            with self.condition:
+                self.expected[key] = max(len(batch), len(self.pending.get(key, [])))
+                self.batches += 1
+                self.frames += len(batch)
+            # Keep the single-frame Results-list shape detectors already index with [0]
+            for result, (_, future) in zip(results, batch):
+                future.set_result([result])
+
+    def stats(self):
+        with self.condition:
+            return {
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'queued': sum(len(requests) for requests in self.pending.values())
+            }
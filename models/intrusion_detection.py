@@ -1,6 +1,7 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.person_tracker import detect_people
 
 class intrusion_detection:
     """
@@ -9,9 +10,11 @@ class intrusion_detection:
     """
     
     def __init__(self, model_path="yolov8n.pt", conf=0.60):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
+        # Fallback zones for calls that pass none; cameras pass their own on every call
         self.restricted_zones = []
+        self.compiled_zones = {}
         
     def set_restricted_zone(self, points):
         """
@@ -20,68 +23,82 @@ class intrusion_detection:
         """
         self.restricted_zones = [np.array(points, dtype=np.int32)]
         
-    def point_in_polygon(self, point, polygon):
-        """Check if a point is inside a polygon using ray casting algorithm"""
-        x, y = point
-        n = len(polygon)
-        inside = False
-        
-        p1x, p1y = polygon[0]
-        for i in range(1, n + 1):
-            p2x, p2y = polygon[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
-            p1x, p1y = p2x, p2y
-        
-        return inside
+    def compile_zones(self, zones, shape):
+        """
+        Rasterise zones for a frame of this shape, once per distinct zones and shape.
+        The instance is shared by every camera thread, so the zones are passed in
+        rather than stored, and the cache is keyed by them.
+        Returns (label_mask, overlay): label_mask holds 0 outside every zone and
+        i + 1 inside zone i; overlay is the outline and label pixels to paint.
+        """
+        height, width = shape[:2]
+        zones = [np.array(zone, dtype=np.int32).reshape(-1, 2) for zone in zones]
+        key = (tuple(zone.tobytes() for zone in zones), height, width)
+        compiled = self.compiled_zones.get(key)
+        if compiled is None:
+            label_mask = np.zeros((height, width), dtype=np.uint8)
+            layer = np.zeros((height, width, 3), dtype=np.uint8)
+            for i, zone in enumerate(zones):
+                cv2.fillPoly(label_mask, [zone], i + 1)
+                cv2.polylines(layer, [zone], True, (255, 0, 0), 2)
+                cv2.putText(layer, "RESTRICTED ZONE", tuple(int(v) for v in zone[0]), 
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+            ys, xs = np.nonzero(layer.any(axis=2))
+            compiled = (label_mask, (ys, xs, layer[ys, xs]))
+            # Cameras rarely change zones; keep the cache from growing without bound
+            if len(self.compiled_zones) >= 32:
+                self.compiled_zones.clear()
+            self.compiled_zones[key] = compiled
+        return compiled
     
-    def process(self, img, flag=True, restricted_zones=None):
+    def process(self, img, flag=True, restricted_zones=None, context=None):
         """
         Process frame for intrusion detection
-        Returns: (intrusion_detected, person_boxes, intrusion_points)
+        Returns: (intrusion_detected, person_boxes, intrusion_points, intruders)
+        With person tracks, intrusion_points only holds people entering a zone for the first time.
+        intruders names each of them as 'track:<id>', or 'zone:<index>' for untracked people.
         """
         if not flag:
-            return (False, [], [])
-            
-        if restricted_zones:
-            self.restricted_zones = [np.array(zone, dtype=np.int32) for zone in restricted_zones]
+            return (False, [], [], [])
         
         person_boxes = []
         intrusion_points = []
-        results = self.model(img, verbose=False)
+        intruders = []
+        zones = restricted_zones or self.restricted_zones
+        label_mask, (overlay_ys, overlay_xs, overlay_pixels) = self.compile_zones(zones, img.shape)
+
+        people = detect_people(self.model, img, context, self.confidence)
+        if people:
+            # Test every person's center point against the zone mask in one lookup
+            boxes = np.array([bbox for bbox, _ in people], dtype=np.int32)
+            centers_x = np.clip((boxes[:, 0] + boxes[:, 2]) // 2, 0, img.shape[1] - 1)
+            centers_y = np.clip((boxes[:, 1] + boxes[:, 3]) // 2, 0, img.shape[0] - 1)
+            zone_labels = label_mask[centers_y, centers_x]
+            inside = zone_labels > 0
         
-        # Detect persons (class 0 in COCO dataset)
-        for box in results[0].boxes:
-            if int(box.cls[0]) == 0 and float(box.conf[0]) > self.confidence:  # Person class
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                person_boxes.append([x1, y1, x2, y2])
-                
-                # Check if person center point is in restricted zone
-                center_x = (x1 + x2) // 2
-                center_y = (y1 + y2) // 2
-                
-                for zone in self.restricted_zones:
-                    if self.point_in_polygon((center_x, center_y), zone):
-                        intrusion_points.append((center_x, center_y))
-                        # Draw red bounding box for intruder
-                        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 0, 255), 3)
-                        cv2.putText(img, "INTRUDER ALERT!", (x1, y1-10), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                        break
-                else:
-                    # Draw green box for authorized person
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        for i, ((x1, y1, x2, y2), track) in enumerate(people):
+            person_boxes.append([x1, y1, x2, y2])
+            
+            if inside[i]:
+                # A tracked person raises the alert once, not on every frame
+                if track is None or not track.get('intrusion_alerted'):
+                    intrusion_points.append((int(centers_x[i]), int(centers_y[i])))
+                    if track is not None:
+                        track['intrusion_alerted'] = True
+                        intruders.append(f"track:{track['id']}")
+                    else:
+                        intruders.append(f"zone:{int(zone_labels[i]) - 1}")
+                # Draw red bounding box for intruder
+                label = f"INTRUDER #{track['id']}" if track is not None else "INTRUDER ALERT!"
+                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 0, 255), 3)
+                cv2.putText(img, label, (x1, y1-10), 
+                          cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+            else:
+                # Draw green box for authorized person
+                cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
         
-        # Draw restricted zones
-        for zone in self.restricted_zones:
-            cv2.polylines(img, [zone], True, (255, 0, 0), 2)
-            cv2.putText(img, "RESTRICTED ZONE", tuple(zone[0]), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+        # Paint the pre-rendered restricted zone outlines
+        img[overlay_ys, overlay_xs] = overlay_pixels
         
         intrusion_detected = len(intrusion_points) > 0
-        return (intrusion_detected, person_boxes, intrusion_points)
\ No newline at end of file
+        return (intrusion_detected, person_boxes, intrusion_points, intruders)
\ No newline at end of file
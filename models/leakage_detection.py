@@ -1,6 +1,6 @@
 import cv2
 import numpy as np
-from ultralytics import YOLO
+from models.frame_context import frame_context
 
 class leakage_detection:
     """
@@ -8,8 +8,7 @@ class leakage_detection:
     Detects visual anomalies and color changes indicating leaks.
     """
     
-    def __init__(self, model_path="yolov8n.pt", conf=0.65):
-        self.model = YOLO(model_path)
+    def __init__(self, conf=0.65):
         self.confidence = conf
         self.leak_colors = {
             'oil': [(0, 0, 0), (50, 50, 50)],      # Dark colors for oil
@@ -17,9 +16,9 @@ class leakage_detection:
             'gas': [(200, 200, 200), (255, 255, 255)]     # Light colors for gas
         }
         
-    def detect_color_anomalies(self, frame):
+    def detect_color_anomalies(self, context):
         """Detect color anomalies that might indicate leaks"""
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        hsv = context.hsv
         
         # Define color ranges for different leak types
         leak_masks = {}
@@ -35,26 +34,26 @@ class leakage_detection:
         leak_masks['water'] = cv2.inRange(hsv, lower_water, upper_water)
         
         # Gas leak detection (using edge detection for distortion)
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray, 50, 150)
-        leak_masks['gas'] = edges
+        leak_masks['gas'] = context.edges(50, 150)
         
         return leak_masks
     
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for leakage detection
         Returns: (leak_detected, bounding_boxes, leak_type)
         """
         if not flag:
             return (False, [], 'none')
+        if context is None:
+            context = frame_context(img)
         
         leak_detected = False
         bounding_boxes = []
         detected_leak_type = 'none'
         
         # Color-based anomaly detection
-        leak_masks = self.detect_color_anomalies(img)
+        leak_masks = self.detect_color_anomalies(context)
         
         for leak_type, mask in leak_masks.items():
             # Find contours in the mask
@@ -77,8 +76,7 @@ class leakage_detection:
         # Additional thermal-based detection (simulated)
         if not leak_detected:
             # Simulate thermal anomaly detection
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            blur = cv2.GaussianBlur(gray, (15, 15), 0)
+            blur = context.blurred(15)
             
             # Find temperature anomalies (bright or dark spots)
             _, thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+
+
+def current_rss():
+    """Resident set size of this process in bytes (0 where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+class shared_model:
+    """
+    A YOLO model that is loaded on first use and shared by every detector
+    asking for the same weights and runtime options.
+
+    Args:
+    model_path: path to the weight file.
+    options: predict() keyword arguments applied to every call (device, half, imgsz...).
+    """
+
+    def __init__(self, model_path, **options):
+        self.model_path = model_path
+        self.options = options
+        self.model = None
+        self.error = None
+        self.load_lock = threading.Lock()
+        self.predict_lock = threading.Lock()
+        self.load_seconds = 0.0
+        self.rss_bytes = 0
+        self.param_bytes = 0
+
+    def load(self):
+        if self.model is not None:
+            return self.model
+
+        with self.load_lock:
+            if self.model is None:
+                if self.error is not None:
+                    raise RuntimeError(f"Model {self.model_path} failed to load: {self.error}")
+                try:
+                    # Import before measuring so the framework itself is not billed to the first model
+                    from ultralytics import YOLO
+
+                    started = time.time()
+                    rss_before = current_rss()
+                    model = YOLO(self.model_path)
+                    self.rss_bytes = max(0, current_rss() - rss_before)
+                    self.load_seconds = time.time() - started
+                    self.param_bytes = sum(p.numel() * p.element_size() for p in model.model.parameters())
+                    self.model = model
+                    print(f"✅ Loaded model {self.model_path} "
+                          f"({self.rss_bytes / 1e6:.1f} MB resident, {self.load_seconds:.2f}s)")
+                except Exception as e:
+                    self.error = e
+                    raise
+        return self.model
+
+    def __call__(self, img, **kwargs):
+        model = self.load()
+        # Ultralytics predictors keep per-call state, so one camera thread at a time
+        with self.predict_lock:
+            return model(img, **{**self.options, **kwargs})
+
+    def memory_info(self):
+        return {
+            'model_path': self.model_path,
+            'options': self.options,
+            'loaded': self.model is not None,
+            'rss_mb': round(self.rss_bytes / 1e6, 1),
+            'parameters_mb': round(self.param_bytes / 1e6, 1),
+            'load_seconds': round(self.load_seconds, 2),
+            'error': str(self.error) if self.error else None
+        }
+
+
+models = {}
+models_lock = threading.Lock()
+
+
+def get_model(model_path, **options):
+    """Return the shared model for these weights and options, creating it on first request"""
+    key = (os.path.abspath(model_path), tuple(sorted(options.items())))
+    with models_lock:
+        model = models.get(key)
+        if model is None:
+            model = shared_model(model_path, **options)
+            models[key] = model
+    return model
+
+
+def memory_report():
+    """Resident memory per registered model"""
+    with models_lock:
+        registered = list(models.values())
+    return [model.memory_info() for model in registered]
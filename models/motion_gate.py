@@ -0,0 +1,62 @@
+import time
+import cv2
+import numpy as np
+
+
+class motion_gate:
+    """
+    Cheap change detector that runs before the models.
+    Compares a small blurred grayscale copy of each frame against a slowly
+    adapting background, so static scenes can skip motion-gated detectors.
+
+    Args:
+    scale_width: width of the downscaled frame that is compared.
+    threshold: grey-level difference that counts as a changed pixel.
+    min_changed: fraction of changed pixels that counts as motion.
+    refresh: seconds after which the gate opens even without motion, so stale results are rechecked.
+    learning_rate: how fast the background absorbs gradual changes such as lighting.
+    """
+
+    def __init__(self, scale_width=160, threshold=25, min_changed=0.005, refresh=5.0, learning_rate=0.05):
+        self.scale_width = scale_width
+        self.threshold = threshold
+        self.min_changed = min_changed
+        self.refresh = refresh
+        self.learning_rate = learning_rate
+        self.background = None
+        self.last_open = 0.0
+        self.changed = 0.0
+        self.frames = 0
+        self.static_frames = 0
+
+    def update(self, frame):
+        """Feed one frame; True when gated detectors should run on it"""
+        height, width = frame.shape[:2]
+        scale_height = max(1, int(height * self.scale_width / width))
+        small = cv2.resize(frame, (self.scale_width, scale_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        self.frames += 1
+        now = time.time()
+        if self.background is None or self.background.shape != gray.shape:
+            self.background = gray.astype(np.float32)
+            self.last_open = now
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+        self.changed = np.count_nonzero(diff > self.threshold) / diff.size
+        cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+        if self.changed >= self.min_changed or now - self.last_open >= self.refresh:
+            self.last_open = now
+            return True
+
+        self.static_frames += 1
+        return False
+
+    def stats(self):
+        return {
+            'changed_fraction': round(self.changed, 4),
+            'static_frames': self.static_frames,
+            'skip_rate': round(self.static_frames / self.frames, 3) if self.frames else 0.0
+        }
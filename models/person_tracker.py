@@ -0,0 +1,174 @@
+import time
+import numpy as np
+from models.result_arrays import result_arrays
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of two (N, 4) and (M, 4) xyxy arrays"""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+def match_costs(track_boxes, boxes):
+    """
+    Pairwise (N, M) matching cost of predicted track boxes against detections:
+    centre distance in units of the track box diagonal, less the IoU so overlapping
+    pairs win ties, and the log ratio of the box sizes (a person's box size barely
+    changes between keyframes).
+    """
+    if len(track_boxes) == 0 or len(boxes) == 0:
+        return np.zeros((len(track_boxes), len(boxes)), dtype=np.float32)
+    a = track_boxes[:, None, :]
+    b = boxes[None, :, :]
+    centre_a = (a[..., :2] + a[..., 2:]) / 2
+    centre_b = (b[..., :2] + b[..., 2:]) / 2
+    size_a = np.maximum(a[..., 2:] - a[..., :2], 1.0)
+    size_b = np.maximum(b[..., 2:] - b[..., :2], 1.0)
+    distance = np.linalg.norm(centre_a - centre_b, axis=-1) / np.linalg.norm(size_a, axis=-1)
+    size_change = np.abs(np.log(size_b / size_a)).max(axis=-1)
+    return distance - iou_matrix(track_boxes, boxes) + size_change
+
+
+def detect_people(model, img, context, confidence):
+    """
+    Person boxes above confidence as [(bbox, track)] pairs.
+    Uses the frame's tracks when a tracker is running (track is the tracker's dict),
+    otherwise runs the model and returns track as None.
+    """
+    if context is not None and context.tracks is not None:
+        # context.tracks only holds tracks matched on the last keyframe (see person_tracker.visible)
+        height, width = img.shape[:2]
+        people = []
+        for track in context.tracks:
+            if track['conf'] > confidence:
+                x1, y1, x2, y2 = track['bbox']
+                bbox = [max(0, min(x1, width)), max(0, min(y1, height)),
+                        max(0, min(x2, width)), max(0, min(y2, height))]
+                people.append((bbox, track))
+        return people
+
+    result = context.arrays(model) if context else result_arrays.from_results(model(img, verbose=False))
+    # Detect persons (class 0 in COCO dataset)
+    return [(bbox, None) for bbox in result.filter(classes=[0], min_conf=confidence).boxes()]
+
+
+class person_tracker:
+    """
+    Lightweight SORT-style tracker for one camera.
+    Person detection runs only on keyframes; in between, every track is moved
+    along its constant-velocity estimate. Each person keeps a stable track ID.
+    Detections are matched to the predicted track boxes by centre distance rather
+    than IoU alone, so people walking at keyframe spacing keep their ID.
+    Tracks that missed the last keyframe are kept for re-association only.
+
+    Args:
+    keyframe_interval: seconds between person detection runs (1/3 = 3 fps).
+    max_cost: largest match_costs value accepted as the same person (about one box
+              diagonal of movement between keyframes).
+    max_age: seconds a track survives without a matching detection.
+    """
+
+    def __init__(self, keyframe_interval=1 / 3, max_cost=1.0, max_age=1.5):
+        self.keyframe_interval = keyframe_interval
+        self.max_cost = max_cost
+        self.max_age = max_age
+        self.tracks = []
+        self.next_id = 1
+        self.last_keyframe = 0.0
+        self.last_predict = time.time()
+        self.keyframes = 0
+        self.propagated = 0
+
+    def keyframe_due(self):
+        return time.time() - self.last_keyframe >= self.keyframe_interval
+
+    def predict(self):
+        """Move every track along its velocity up to now"""
+        now = time.time()
+        dt = now - self.last_predict
+        self.last_predict = now
+        for track in self.tracks:
+            track['box'] += track['velocity'] * dt
+            track['bbox'] = list(map(int, track['box']))
+        return self.tracks
+
+    def propagate(self):
+        self.propagated += 1
+        return self.predict()
+
+    def visible(self):
+        """Tracks matched on the last keyframe, the only ones reported as people in the frame"""
+        return [t for t in self.tracks if t['missed'] == 0]
+
+    def update(self, boxes, confs):
+        """Match keyframe detections to predicted tracks, start new tracks and retire lost ones"""
+        now = time.time()
+        self.last_keyframe = now
+        self.keyframes += 1
+        self.predict()
+
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        confs = np.asarray(confs, dtype=np.float32).reshape(-1)
+        track_boxes = np.array([t['box'] for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        costs = match_costs(track_boxes, boxes)
+
+        # Greedy assignment, cheapest pairs first
+        matched_tracks, matched_dets = set(), set()
+        for t, d in zip(*np.unravel_index(np.argsort(costs, axis=None), costs.shape)):
+            if costs[t, d] > self.max_cost:
+                break
+            if t in matched_tracks or d in matched_dets:
+                continue
+            matched_tracks.add(t)
+            matched_dets.add(d)
+
+            track = self.tracks[t]
+            elapsed = max(now - track['last_seen'], 1e-3)
+            velocity = (boxes[d] - track['detected_box']) / elapsed
+            track['velocity'] = 0.5 * track['velocity'] + 0.5 * velocity
+            track['box'] = boxes[d].copy()
+            track['detected_box'] = boxes[d].copy()
+            track['bbox'] = list(map(int, boxes[d]))
+            track['conf'] = float(confs[d])
+            track['last_seen'] = now
+            track['hits'] += 1
+            track['missed'] = 0
+
+        for i, track in enumerate(self.tracks):
+            if i not in matched_tracks:
+                track['missed'] += 1
+        self.tracks = [t for i, t in enumerate(self.tracks)
+                       if i in matched_tracks or now - t['last_seen'] <= self.max_age]
+
+        for d in range(len(boxes)):
+            if d in matched_dets:
+                continue
+            self.tracks.append({
+                'id': self.next_id,
+                'box': boxes[d].copy(),
+                'detected_box': boxes[d].copy(),
+                'bbox': list(map(int, boxes[d])),
+                'velocity': np.zeros(4, dtype=np.float32),
+                'conf': float(confs[d]),
+                'last_seen': now,
+                'hits': 1,
+                'missed': 0
+            })
+            self.next_id += 1
+        return self.tracks
+
+    def stats(self):
+        return {
+            'active_tracks': len(self.visible()),
+            'lost_tracks': len(self.tracks) - len(self.visible()),
+            'keyframes': self.keyframes,
+            'propagated_frames': self.propagated
+        }
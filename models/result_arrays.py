@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class result_arrays:
+    """
+    Boxes, confidences and classes of one YOLO result as NumPy arrays.
+    The tensors are copied out once; class and confidence filters are
+    vectorised masks instead of a Python loop over every box.
+
+    Args:
+    xyxy: (N, 4) float32 box corners.
+    conf: (N,) float32 confidences.
+    cls: (N,) int32 class ids.
+    """
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    @classmethod
+    def from_results(cls, results):
+        """Convert the list returned by a model call (first image only)"""
+        boxes = results[0].boxes
+        return cls(
+            boxes.xyxy.cpu().numpy().astype(np.float32).reshape(-1, 4),
+            boxes.conf.cpu().numpy().astype(np.float32).reshape(-1),
+            boxes.cls.cpu().numpy().astype(np.int32).reshape(-1)
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    def filter(self, classes=None, min_conf=None):
+        """Detections of the given classes scoring strictly above min_conf"""
+        mask = np.ones(len(self.conf), dtype=bool)
+        if classes is not None:
+            mask &= np.isin(self.cls, list(classes))
+        if min_conf is not None:
+            mask &= self.conf > min_conf
+        return result_arrays(self.xyxy[mask], self.conf[mask], self.cls[mask])
+
+    def boxes(self):
+        """Integer [x1, y1, x2, y2] lists, as the detectors draw and store them"""
+        return self.xyxy.astype(np.int32).tolist()
@@ -1,4 +1,5 @@
-from ultralytics import YOLO
+from models.model_registry import get_model
+from models.result_arrays import result_arrays
 import cv2
 from playsound import playsound
 import threading
@@ -10,7 +11,7 @@ class smoke_detection:
     """
     
     def __init__(self, model_path, conf=0.70, sound_path="./static/audio/fire_alarm.mp3"):
-        self.model = YOLO(model_path)
+        self.model = get_model(model_path)
         self.confidence = conf
         self.sound_path = sound_path
         self.last_alert_time = 0
@@ -19,7 +20,7 @@ class smoke_detection:
         """Play fire/smoke alert sound in separate thread"""
         threading.Thread(target=playsound, args=(self.sound_path,), daemon=True).start()
 
-    def process(self, img, flag=True):
+    def process(self, img, flag=True, context=None):
         """
         Process frame for fire and smoke detection
         Returns: (detection_found, bounding_boxes, detection_types)
@@ -27,23 +28,13 @@ class smoke_detection:
         if not flag:
             return (False, [], [])
 
-        bb_boxes = []
-        detection_types = []
-        result = self.model(img, verbose=False)
+        result = context.arrays(self.model) if context else result_arrays.from_results(self.model(img, verbose=False))
+        result = result.filter(min_conf=self.confidence)
+        bb_boxes = result.boxes()
 
-        for box in result[0].boxes:
-            if float(box.conf[0]) > self.confidence:
-                bb = list(map(int, box.xyxy[0]))
-                bb_boxes.append(bb)
-                
-                # Determine detection type based on class
-                class_id = int(box.cls[0])
-                if class_id == 0:  # Fire class
-                    detection_types.append("fire")
-                elif class_id == 1:  # Smoke class
-                    detection_types.append("smoke")
-                else:
-                    detection_types.append("fire_smoke")
+        # Determine detection type based on class: 0 is fire, 1 is smoke
+        detection_types = [("fire" if class_id == 0 else "smoke" if class_id == 1 else "fire_smoke")
+                           for class_id in result.cls.tolist()]
 
         if len(bb_boxes) > 0:
             found = True
@@ -0,0 +1,77 @@
+import time
+
+
+class rate_controller:
+    """
+    Chooses how often one camera is analysed from the measured pipeline time.
+    The rate backs off multiplicatively when frames miss the latency target or
+    the CPU budget, and creeps back up while there is headroom. It never drops
+    below the camera's configured floor.
+
+    Args:
+    target_latency: seconds a frame may take from capture to annotated output.
+    cpu_budget: share of one core this camera's analysis may use.
+    min_fps: floor for the analysis rate (e.g. 5 when fire detection must keep up).
+    max_fps: ceiling for the analysis rate.
+    """
+
+    def __init__(self, target_latency=0.5, cpu_budget=0.5, min_fps=1.0, max_fps=15.0):
+        self.target_latency = target_latency
+        self.cpu_budget = cpu_budget
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.fps = max_fps
+        self.process_time = 0.0
+        self.latency = 0.0
+        self.drop_rate = 0.0
+        self.last_start = 0.0
+        self.last_record = None
+
+    def configure(self, target_latency=None, cpu_budget=None, min_fps=None, max_fps=None):
+        if target_latency is not None:
+            self.target_latency = target_latency
+        if cpu_budget is not None:
+            self.cpu_budget = cpu_budget
+        if min_fps is not None:
+            self.min_fps = min_fps
+        if max_fps is not None:
+            self.max_fps = max_fps
+        self.fps = min(max(self.fps, self.min_fps), max(self.min_fps, self.max_fps))
+
+    def delay(self):
+        """Seconds to wait before the next frame should be analysed"""
+        return max(0.0, self.last_start + 1.0 / self.fps - time.time())
+
+    def start_frame(self):
+        self.last_start = time.time()
+
+    def record(self, process_time, latency, dropped=0):
+        """Feed back one analysed frame: detection time, capture-to-output latency and frames dropped since the last one"""
+        now = time.time()
+        self.process_time = process_time if self.process_time == 0.0 else 0.8 * self.process_time + 0.2 * process_time
+        self.latency = latency if self.latency == 0.0 else 0.8 * self.latency + 0.2 * latency
+        if self.last_record is not None and now > self.last_record:
+            self.drop_rate = 0.8 * self.drop_rate + 0.2 * (dropped / (now - self.last_record))
+        self.last_record = now
+
+        budget_fps = self.cpu_budget / self.process_time if self.process_time > 0 else self.max_fps
+        if self.latency > self.target_latency or self.fps > budget_fps:
+            fps = min(self.fps * 0.8, budget_fps)
+        else:
+            fps = self.fps + 0.5
+        # The floor wins over the budget: a camera that must be watched is never starved
+        self.fps = min(max(fps, self.min_fps), max(self.min_fps, self.max_fps))
+
+    def overloaded(self):
+        """True while frames miss the latency target or the camera is over its CPU budget"""
+        return self.latency > self.target_latency or self.process_time * self.fps > self.cpu_budget
+
+    def stats(self):
+        return {
+            'analysis_fps': round(self.fps, 2),
+            'min_fps': self.min_fps,
+            'process_ms': round(self.process_time * 1000, 1),
+            'latency_ms': round(self.latency * 1000, 1),
+            'dropped_fps': round(self.drop_rate, 2),
+            'overloaded': self.overloaded()
+        }
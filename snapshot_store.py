@@ -0,0 +1,81 @@
+import hashlib
+import os
+import re
+
+import cv2
+import numpy as np
+
+KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+class snapshot_store:
+    """
+    Content-addressed store for alert snapshots on disk.
+    Each JPEG is saved once under the SHA-256 of its bytes, next to a downscaled
+    thumbnail, so the alert row only keeps the key. Identical snapshots share a file.
+
+    Args:
+    root: directory holding the store (two-level fan-out by key prefix).
+    thumb_width: width of the generated thumbnails.
+    quality: JPEG quality used by put_frame.
+    """
+
+    def __init__(self, root, thumb_width=160, quality=90):
+        self.root = root
+        self.thumb_width = thumb_width
+        self.quality = quality
+
+    def path(self, key, thumbnail=False):
+        if not KEY_PATTERN.match(key or ''):
+            raise ValueError("Invalid snapshot key")
+        name = f"{key}_thumb.jpg" if thumbnail else f"{key}.jpg"
+        return os.path.join(self.root, key[:2], name)
+
+    def write_file(self, path, data):
+        # Write then rename so readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, jpeg, frame=None):
+        """
+        Store JPEG bytes and their thumbnail; returns the key.
+        frame is the decoded image when the caller has it, to skip decoding for the thumbnail.
+        """
+        key = hashlib.sha256(jpeg).hexdigest()
+        path = self.path(key)
+        if not os.path.exists(path):
+            self.write_file(path, jpeg)
+        thumb_path = self.path(key, thumbnail=True)
+        if not os.path.exists(thumb_path):
+            if frame is None:
+                frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is not None:
+                height, width = frame.shape[:2]
+                thumb_height = max(1, int(height * self.thumb_width / width))
+                thumb = cv2.resize(frame, (self.thumb_width, thumb_height), interpolation=cv2.INTER_AREA)
+                self.write_file(thumb_path, cv2.imencode('.jpg', thumb, [cv2.IMWRITE_JPEG_QUALITY, 75])[1].tobytes())
+        return key
+
+    def put_frame(self, frame):
+        """Encode a frame as JPEG and store it; returns (key, jpeg size in bytes)"""
+        jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])[1].tobytes()
+        return self.put(jpeg, frame), len(jpeg)
+
+    def get(self, key, thumbnail=False):
+        """JPEG bytes for key, or None when missing"""
+        try:
+            with open(self.path(key, thumbnail), 'rb') as f:
+                return f.read()
+        except (OSError, ValueError):
+            return None
+
+    def delete(self, key):
+        for thumbnail in (False, True):
+            try:
+                os.remove(self.path(key, thumbnail))
+            except (OSError, ValueError):
+                pass
+
@@ -0,0 +1,65 @@
+import hashlib
+import json
+import threading
+import time
+
+
+class stats_cache:
+    """
+    Per-user dashboard counters kept in memory for a short time, so polling
+    dashboards do not query the database on every request.
+    Entries expire after ttl seconds (the last-24-hour counts slide with time) and are
+    dropped as soon as the user's alerts or cameras change. Each entry carries an ETag
+    derived from its contents, so unchanged counters can be answered with a 304.
+
+    Args:
+    ttl: seconds a computed set of counters is served before being recomputed.
+    version: optional version(user_id) returning a cheap change marker; an entry is only
+             served while the marker is unchanged, which catches writes made by other processes.
+    """
+
+    def __init__(self, ttl=30, version=None):
+        self.ttl = ttl
+        self.version = version
+        self.lock = threading.Lock()
+        self.entries = {}
+        # Bumped on invalidation so a computation that raced with a write is not cached
+        self.generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id, compute):
+        """(counters, etag) for a user; compute() builds the counters dict on a miss"""
+        now = time.time()
+        version = self.version(user_id) if self.version is not None else None
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[3] == version:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            generation = self.generations.get(user_id, 0)
+
+        counters = compute()
+        etag = hashlib.sha1(json.dumps(counters, sort_keys=True, default=str).encode()).hexdigest()
+        with self.lock:
+            if self.generations.get(user_id, 0) == generation:
+                self.entries[user_id] = (now + self.ttl, counters, etag, version)
+        return counters, etag
+
+    def invalidate(self, *user_ids):
+        with self.lock:
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+                self.generations[user_id] = self.generations.get(user_id, 0) + 1
+                self.invalidations += 1
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations
+        }
@@ -0,0 +1,363 @@
+# worker_pool.py
+#
+# Multiprocess mode for detection_service.py. Each camera gets a capture
+# process that decodes frames into a shared-memory ring buffer, and a pool of
+# detection processes reads those rings, so cameras no longer share one GIL
+# and one torch thread pool. Detection results come back as compact arrays.
+
+import functools
+import multiprocessing as mp
+import queue
+import time
+import zlib
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+# Largest frame a ring slot holds (1080p); bigger frames are scaled down, keeping their aspect ratio
+RING_FRAME_SHAPE = (1080, 1920, 3)
+
+
+class frame_ring:
+    """
+    Fixed-size ring of frames in shared memory.
+    One capture process writes, detection processes copy out the newest frame.
+    Each slot records the size of the frame it holds, so cameras keep their native
+    resolution and aspect ratio.
+
+    Args:
+    name: shared memory block name.
+    shape: (height, width, channels) capacity of each slot; frames may be smaller in any shape.
+    slots: number of frames kept in the ring.
+    create: allocate the block (owner) instead of attaching to it.
+    """
+
+    def __init__(self, name, shape, slots=4, create=False):
+        self.name = name
+        self.shape = tuple(shape)
+        self.slots = slots
+        header_bytes = 8 * (1 + 4 * slots)
+        frame_bytes = self.capacity = int(np.prod(self.shape))
+
+        if create:
+            size = header_bytes + slots * frame_bytes
+            try:
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                # Left behind by a service that did not shut down cleanly
+                stale = shared_memory.SharedMemory(name=name)
+                stale.close()
+                stale.unlink()
+                self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            # Only the owner may unlink the block; stop the tracker doing it when this process exits
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+
+        # header[0] is the latest sequence number, header[1 + slot] the sequence held by each slot,
+        # header[1 + slots + slot] its capture time in milliseconds and the last two blocks its height and width
+        self.header = np.ndarray((1 + 4 * slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, frame_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.header[:] = 0
+
+    def write(self, frame):
+        if frame.size > self.capacity or frame.ndim != 3 or frame.shape[2] != self.shape[2]:
+            raise ValueError(f"Frame of shape {frame.shape} does not fit a ring slot of {self.shape}")
+        seq = int(self.header[0]) + 1
+        slot = seq % self.slots
+        self.header[1 + slot] = -1
+        self.frames[slot][:frame.size] = frame.reshape(-1)
+        self.header[1 + self.slots + slot] = int(time.time() * 1000)
+        self.header[1 + 2 * self.slots + slot] = frame.shape[0]
+        self.header[1 + 3 * self.slots + slot] = frame.shape[1]
+        self.header[1 + slot] = seq
+        self.header[0] = seq
+        return seq
+
+    def read_latest(self, last_seq=0):
+        """
+        Copy of the newest frame and its capture time.
+        Returns (last_seq, None, 0.0) when nothing newer than last_seq is ready.
+        """
+        seq = int(self.header[0])
+        if seq == 0 or seq == last_seq:
+            return last_seq, None, 0.0
+        slot = seq % self.slots
+        captured = self.header[1 + self.slots + slot] / 1000.0
+        height = int(self.header[1 + 2 * self.slots + slot])
+        width = int(self.header[1 + 3 * self.slots + slot])
+        channels = self.shape[2]
+        frame = self.frames[slot][:height * width * channels].reshape(height, width, channels).copy()
+        if int(self.header[1 + slot]) != seq:
+            # The writer lapped us while copying; the caller retries on the next poll
+            return last_seq, None, 0.0
+        return seq, frame, captured
+
+    def close(self):
+        del self.header, self.frames
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class ring_capture:
+    """VideoCapture-like reader over a frame_ring, used as a camera_pipeline capture"""
+
+    def __init__(self, ring, timeout=10.0, poll=0.005):
+        self.ring = ring
+        self.timeout = timeout
+        self.poll = poll
+        self.seq = 0
+        self.dropped = 0
+        self.frame_time = 0.0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        deadline = time.time() + self.timeout
+        while time.time() < deadline:
+            seq, frame, captured = self.ring.read_latest(self.seq)
+            if frame is not None:
+                if self.seq:
+                    self.dropped += max(0, seq - self.seq - 1)
+                self.seq = seq
+                self.frame_time = captured
+                return True, frame
+            time.sleep(self.poll)
+        return False, None
+
+    def release(self):
+        self.ring.close()
+
+
+def ring_name(key):
+    user_id, camid = key
+    return f"iai_{user_id}_{zlib.crc32(camid.encode()):08x}"
+
+
+def pack_results(context):
+    """Boxes, classes and scores of every model run on a frame as compact NumPy arrays"""
+    packed = {}
+    for (model, kwargs) in context.results:
+        arrays = context.arrays(model, **dict(kwargs))
+        packed[model.model_path] = (arrays.xyxy, arrays.cls.astype(np.int16), arrays.conf)
+    return packed
+
+
+def capture_worker(name, camid, shape, slots, stop_event):
+    """Capture process: decode frames from one camera into its ring"""
+    import cv2
+    from camera_pipeline import open_capture
+
+    ring = frame_ring(name, shape, slots)
+    try:
+        cap = open_capture(camid)
+    except Exception as e:
+        print(f"Error opening camera {camid}: {e}")
+        ring.close()
+        return
+
+    try:
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.size > ring.capacity:
+                # Scale down uniformly; a stretch would distort boxes, zones and snapshots
+                scale = (ring.capacity / frame.size) ** 0.5
+                size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            ring.write(frame)
+    finally:
+        cap.release()
+        ring.close()
+
+
+def detection_worker(commands, results, interval=1.0):
+    """Detection process: run a camera_pipeline per assigned ring until told to stop"""
+    from app import analyze_frame
+    from camera_pipeline import camera_pipeline
+
+    pipelines = {}
+
+    def report(key, context):
+        try:
+            results.put_nowait((key, time.time(), pack_results(context)))
+        except queue.Full:
+            pass
+
+    def start(key, settings, name, shape, slots, publish_path):
+        pipeline = camera_pipeline(
+            key[1],
+            functools.partial(analyze_frame, report=functools.partial(report, key)),
+            settings, keep_alive=True, publish_path=publish_path,
+            capture_factory=lambda camid: ring_capture(frame_ring(name, shape, slots)))
+        pipeline.start()
+        pipelines[key] = pipeline
+
+    while True:
+        try:
+            command = commands.get(timeout=interval)
+        except queue.Empty:
+            command = None
+
+        if command is not None:
+            action, key = command[0], command[1]
+            if action == 'exit':
+                break
+            if action == 'start':
+                start(key, *command[2:])
+            elif action == 'update' and key in pipelines:
+                pipelines[key].update_settings(command[2])
+            elif action == 'stop' and key in pipelines:
+                pipelines.pop(key).stop()
+
+        # A pipeline ends when its ring stops advancing; reopen it once capture resumes
+        for pipeline in pipelines.values():
+            if not pipeline.running:
+                pipeline.start()
+
+    for pipeline in pipelines.values():
+        pipeline.stop()
+
+
+class worker_pool:
+    """
+    Capture and detection processes for every enabled camera.
+
+    Args:
+    workers: number of detection processes; cameras are spread across them.
+    slots: frames kept in each camera's ring buffer.
+    max_backoff: longest wait before restarting a failing capture process.
+    """
+
+    def __init__(self, workers=2, slots=4, max_backoff=60.0):
+        self.ctx = mp.get_context('spawn')
+        self.slots = slots
+        self.max_backoff = max_backoff
+        self.shape = RING_FRAME_SHAPE
+        self.results = self.ctx.Queue(maxsize=1000)
+        self.detectors = [self.start_detector() for _ in range(workers)]
+        self.cameras = {}
+        self.latest = {}
+        self.frames_analysed = {}
+
+    def start_detector(self):
+        commands = self.ctx.Queue()
+        process = self.ctx.Process(target=detection_worker, args=(commands, self.results), daemon=True)
+        process.start()
+        return {'process': process, 'commands': commands, 'cameras': set()}
+
+    def start_capture(self, camera):
+        camera['stop_event'] = self.ctx.Event()
+        camera['process'] = self.ctx.Process(
+            target=capture_worker,
+            args=(camera['ring'].name, camera['settings']['cam_id'], self.shape, self.slots, camera['stop_event']),
+            daemon=True)
+        camera['process'].start()
+        camera['started'] = time.time()
+
+    def assign(self, key, camera):
+        detector = min(self.detectors, key=lambda d: len(d['cameras']))
+        detector['cameras'].add(key)
+        detector['commands'].put(('start', key, camera['settings'], camera['ring'].name,
+                                  self.shape, self.slots, camera['publish_path']))
+
+    def add_camera(self, key, settings, publish_path):
+        camera = {
+            'settings': settings,
+            'publish_path': publish_path,
+            'ring': frame_ring(ring_name(key), self.shape, self.slots, create=True),
+            'failures': 0,
+            'retry_at': None
+        }
+        self.cameras[key] = camera
+        self.start_capture(camera)
+        self.assign(key, camera)
+        print(f"▶️ Started capture and detection processes for camera {key[1]} (user {key[0]})")
+
+    def remove_camera(self, key):
+        camera = self.cameras.pop(key)
+        camera['stop_event'].set()
+        camera['process'].join(timeout=5)
+        for detector in self.detectors:
+            if key in detector['cameras']:
+                detector['cameras'].discard(key)
+                detector['commands'].put(('stop', key))
+        camera['ring'].close()
+        camera['ring'].unlink()
+        print(f"⏹️ Stopped processes for camera {key[1]} (user {key[0]})")
+
+    def check_processes(self):
+        """Restart dead detection processes and, with backoff, dead capture processes"""
+        for i, detector in enumerate(self.detectors):
+            if not detector['process'].is_alive():
+                print(f"⚠️ Detection process {i} exited; restarting it")
+                cameras = detector['cameras']
+                self.detectors[i] = self.start_detector()
+                for key in cameras:
+                    self.assign(key, self.cameras[key])
+
+        now = time.time()
+        for key, camera in self.cameras.items():
+            if camera['process'].is_alive():
+                continue
+            if camera['retry_at'] is None:
+                # A capture that ran for a while before dying starts a fresh backoff sequence
+                camera['failures'] = 1 if now - camera['started'] > self.max_backoff else camera['failures'] + 1
+                camera['retry_at'] = now + min(self.max_backoff, 2 ** camera['failures'])
+                print(f"⚠️ Capture for camera {key[1]} stopped. Restarting in {camera['retry_at'] - now:.0f}s")
+            elif now >= camera['retry_at']:
+                camera['retry_at'] = None
+                self.start_capture(camera)
+
+    def drain_results(self):
+        while True:
+            try:
+                key, timestamp, packed = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.latest[key] = (timestamp, packed)
+            self.frames_analysed[key] = self.frames_analysed.get(key, 0) + 1
+
+    def stats(self):
+        """Frames analysed and detections in the latest result, per camera"""
+        return {
+            key: {
+                'frames_analysed': self.frames_analysed.get(key, 0),
+                'detections': {path: len(arrays[1]) for path, arrays in self.latest[key][1].items()}
+                if key in self.latest else {}
+            }
+            for key in self.cameras
+        }
+
+    def sync(self, wanted, publish_path):
+        """Match the running processes to the wanted camera settings"""
+        self.drain_results()
+
+        for key in list(self.cameras):
+            if key not in wanted:
+                self.remove_camera(key)
+
+        for key, settings in wanted.items():
+            camera = self.cameras.get(key)
+            if camera is None:
+                self.add_camera(key, settings, publish_path(key))
+            elif camera['settings'] != settings:
+                camera['settings'] = settings
+                for detector in self.detectors:
+                    if key in detector['cameras']:
+                        detector['commands'].put(('update', key, settings))
+
+        self.check_processes()
+
+    def close(self):
+        for key in list(self.cameras):
+            self.remove_camera(key)
+        for detector in self.detectors:
+            detector['commands'].put(('exit', None))
+        for detector in self.detectors:
+            detector['process'].join(timeout=5)